@@ -0,0 +1,159 @@
+"""
+Feeds iCalendar (.ics) por sala para suscribirse desde Outlook / Google Calendar.
+- Ventana móvil: desde FEED_DAYS_BACK días atrás hasta FEED_DAYS_AHEAD adelante.
+- Caché en memoria por sala, indexada por Room.bookings_version: cualquier
+  escritura de reservas incrementa la versión de la sala (también entre
+  workers, porque vive en la base de datos) y el feed se regenera una sola vez.
+- ETag / Last-Modified derivados de la versión (feed_validators) para responder
+  304 sin consultar reservas ni construir el feed.
+"""
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+FEED_DAYS_BACK = 30
+FEED_DAYS_AHEAD = 180
+FEED_TZID = "America/Bogota"
+
+# Bogotá no tiene horario de verano: UTC-5 todo el año
+_VTIMEZONE = [
+    "BEGIN:VTIMEZONE",
+    f"TZID:{FEED_TZID}",
+    "BEGIN:STANDARD",
+    "DTSTART:19700101T000000",
+    "TZOFFSETFROM:-0500",
+    "TZOFFSETTO:-0500",
+    "TZNAME:-05",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]
+
+_cache: dict[int, tuple[tuple, "RoomFeed"]] = {}
+_cache_lock = threading.Lock()
+
+
+class RoomFeed:
+    def __init__(self, body: str, etag: str, last_modified: datetime):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def _escape(value: str) -> str:
+    return (
+        (value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Parte líneas de más de 75 octetos (RFC 5545, 3.1)."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line
+    parts = []
+    while len(raw) > 75:
+        cut = 75 if not parts else 74
+        # No cortar en medio de un carácter UTF-8
+        while cut > 0 and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw = raw[cut:]
+    parts.append(raw.decode("utf-8"))
+    return "\r\n ".join(parts)
+
+
+def _local(d: date, t) -> str:
+    return f"{d:%Y%m%d}T{t:%H%M%S}"
+
+
+def _utc(dt: datetime) -> str:
+    return f"{dt:%Y%m%dT%H%M%SZ}"
+
+
+def _vevent(booking: models.Booking, room: models.Room) -> list[str]:
+    summary = f"{booking.user_name or 'Reserva'} ({booking.area or '-'})"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:booking-{booking.id}@chvs-salas",
+        f"DTSTAMP:{_utc(booking.created_at or datetime.utcnow())}",
+        f"DTSTART;TZID={FEED_TZID}:{_local(booking.date, booking.start_time)}",
+        f"DTEND;TZID={FEED_TZID}:{_local(booking.date, booking.end_time)}",
+        f"SUMMARY:{_escape(summary)}",
+        f"LOCATION:{_escape(room.name)}",
+    ]
+    if booking.attendees:
+        lines.append(f"DESCRIPTION:{_escape(f'Asistentes: {booking.attendees}')}")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def _build(db: Session, room: models.Room, window_start: date) -> str:
+    bookings = (
+        db.query(models.Booking)
+        .filter(
+            models.Booking.room_id == room.id,
+            models.Booking.date >= window_start,
+            models.Booking.date <= window_start + timedelta(days=FEED_DAYS_BACK + FEED_DAYS_AHEAD),
+        )
+        .order_by(models.Booking.date, models.Booking.start_time)
+        .all()
+    )
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//CHVS//Reserva de Salas//ES",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(f'CHVS - {room.name}')}",
+        f"X-WR-TIMEZONE:{FEED_TZID}",
+        *_VTIMEZONE,
+    ]
+    for booking in bookings:
+        lines.extend(_vevent(booking, room))
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+
+def _utc_today() -> date:
+    return datetime.utcnow().date()
+
+
+def feed_validators(room: models.Room) -> tuple[str, datetime]:
+    """ETag y Last-Modified del feed sin consultar reservas.
+
+    Todo en UTC, igual que Room.bookings_updated_at: la ventana avanza a la
+    medianoche UTC y esa medianoche es también el Last-Modified mínimo.
+    """
+    today = _utc_today()
+    window_start = today - timedelta(days=FEED_DAYS_BACK)
+    etag = f'"room{room.id}-v{room.bookings_version or 0}-{window_start:%Y%m%d}"'
+    # La ventana avanza cada día aunque no haya escrituras
+    last_modified = max(
+        room.bookings_updated_at or datetime.min,
+        datetime.combine(today, time.min),
+    ).replace(microsecond=0, tzinfo=timezone.utc)
+    return etag, last_modified
+
+
+def get_room_feed(db: Session, room: models.Room) -> RoomFeed:
+    """Devuelve el feed de la sala, regenerándolo solo si cambió su versión o el día."""
+    window_start = _utc_today() - timedelta(days=FEED_DAYS_BACK)
+    key = (room.bookings_version or 0, window_start)
+
+    with _cache_lock:
+        cached = _cache.get(room.id)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    etag, last_modified = feed_validators(room)
+    feed = RoomFeed(body=_build(db, room, window_start), etag=etag, last_modified=last_modified)
+    with _cache_lock:
+        _cache[room.id] = (key, feed)
+    return feed
@@ -1,19 +1,23 @@
 import os
 from urllib.parse import quote, unquote, urlsplit, urlunsplit
 
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from ..config import load_environment
 
 load_environment()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
+# Réplica de solo lectura opcional; sin ella todo va a la base principal
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
 
-# Railway may provide postgres://, SQLAlchemy expects postgresql://
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+# Tras una escritura, el cliente lee de la principal durante este tiempo
+# (cookie) para ver sus propios cambios aunque la réplica vaya con retraso.
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+PRIMARY_STICKY_COOKIE = "db_primary"
 
 
 def _sanitize_postgres_url(url: str) -> str:
@@ -35,21 +39,60 @@ def _sanitize_postgres_url(url: str) -> str:
     return urlunsplit((parsed.scheme, safe_netloc, parsed.path, parsed.query, parsed.fragment))
 
 
-DATABASE_URL = _sanitize_postgres_url(DATABASE_URL)
+def _normalize_url(url: str) -> str:
+    # Railway may provide postgres://, SQLAlchemy expects postgresql://
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return _sanitize_postgres_url(url)
 
-engine_kwargs = {}
-if DATABASE_URL.startswith("sqlite"):
-    engine_kwargs["connect_args"] = {"check_same_thread": False}
 
-engine = create_engine(DATABASE_URL, **engine_kwargs)
+def _create_engine(url: str):
+    engine_kwargs = {}
+    if url.startswith("sqlite"):
+        engine_kwargs["connect_args"] = {"check_same_thread": False}
+    return create_engine(url, **engine_kwargs)
+
+
+DATABASE_URL = _normalize_url(DATABASE_URL)
+
+engine = _create_engine(DATABASE_URL)
+replica_engine = _create_engine(_normalize_url(DATABASE_REPLICA_URL)) if DATABASE_REPLICA_URL else engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+class RoutingSession(Session):
+    """Lee de la réplica y escribe en la principal.
+
+    Cualquier flush (INSERT/UPDATE/DELETE) va a la principal aunque la sesión
+    se haya abierto para lectura.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing:
+            return engine
+        return replica_engine
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request):
+    """Sesión para rutas de solo lectura: réplica, salvo tras una escritura reciente."""
+    if replica_engine is engine or request.cookies.get(PRIMARY_STICKY_COOKIE):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,175 @@
+"""
+Migraciones de datos que no puede hacer `Base.metadata.create_all`.
+Se ejecutan en el arranque (startup_db_seed) y son idempotentes.
+"""
+import os
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+# True mientras bookings conserve user_name/user_email/area (doble escritura)
+legacy_columns_present = False
+
+# Índices y objetos de búsqueda que dependían de las columnas de texto de bookings
+_LEGACY_SQLITE_OBJECTS = [
+    "DROP TRIGGER IF EXISTS bookings_fts_ai",
+    "DROP TRIGGER IF EXISTS bookings_fts_ad",
+    "DROP TRIGGER IF EXISTS bookings_fts_au",
+    "DROP TABLE IF EXISTS bookings_fts",
+]
+_LEGACY_INDEXES = [
+    "ix_bookings_user_name",
+    "ix_bookings_user_email",
+    "ix_bookings_user_name_trgm",
+    "ix_bookings_user_email_trgm",
+    "ix_bookings_area_trgm",
+]
+_LEGACY_COLUMNS = ["user_name", "user_email", "area"]
+
+
+def _booking_columns(db: Session) -> set[str]:
+    return {c["name"] for c in inspect(db.get_bind()).get_columns("bookings")}
+
+
+def _try(db: Session, sql: str) -> bool:
+    try:
+        db.execute(text(sql))
+        db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        return False
+
+
+def _backfill_dimensions(db: Session) -> None:
+    """Rellena areas/requesters y asigna area_id/requester_id a partir del texto.
+
+    También sube bookings_version de las salas afectadas (como _touch_rooms en
+    main.py): el ETag de /api/bookings y los feeds .ics dependen de esa versión,
+    y las filas rellenadas (p. ej. escritas por la versión anterior durante el
+    despliegue) cambian lo que muestran. Quien llama hace el commit.
+    """
+    db.execute(
+        text(
+            """
+            UPDATE rooms SET
+                bookings_version = COALESCE(bookings_version, 0) + 1,
+                bookings_updated_at = :now
+            WHERE id IN (
+                SELECT DISTINCT room_id FROM bookings
+                WHERE requester_id IS NULL OR area_id IS NULL
+            )
+            """
+        ),
+        {"now": datetime.utcnow()},
+    )
+    db.execute(text(
+        """
+        INSERT INTO areas (name)
+        SELECT DISTINCT COALESCE(b.area, '') FROM bookings b
+        WHERE b.area_id IS NULL
+          AND NOT EXISTS (SELECT 1 FROM areas a WHERE a.name = COALESCE(b.area, ''))
+        """
+    ))
+    db.execute(text(
+        """
+        INSERT INTO requesters (name, email)
+        SELECT DISTINCT COALESCE(b.user_name, ''), COALESCE(b.user_email, '') FROM bookings b
+        WHERE b.requester_id IS NULL
+          AND NOT EXISTS (
+            SELECT 1 FROM requesters r
+            WHERE r.name = COALESCE(b.user_name, '') AND r.email = COALESCE(b.user_email, '')
+        )
+        """
+    ))
+    db.execute(text(
+        """
+        UPDATE bookings SET area_id = (
+            SELECT a.id FROM areas a WHERE a.name = COALESCE(bookings.area, '')
+        )
+        WHERE area_id IS NULL
+        """
+    ))
+    db.execute(text(
+        """
+        UPDATE bookings SET requester_id = (
+            SELECT r.id FROM requesters r
+            WHERE r.name = COALESCE(bookings.user_name, '')
+              AND r.email = COALESCE(bookings.user_email, '')
+        )
+        WHERE requester_id IS NULL
+        """
+    ))
+
+
+def _drop_legacy_columns(db: Session) -> bool:
+    """Elimina las columnas de texto en una sola transacción (todo o nada).
+
+    Se vuelve a rellenar justo antes para no perder filas escritas por una
+    versión anterior desde el último arranque.
+    """
+    try:
+        _backfill_dimensions(db)
+        if db.get_bind().dialect.name == "sqlite":
+            for sql in _LEGACY_SQLITE_OBJECTS:
+                db.execute(text(sql))
+        for index in _LEGACY_INDEXES:
+            db.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        for col in _LEGACY_COLUMNS:
+            db.execute(text(f"ALTER TABLE bookings DROP COLUMN {col}"))
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"[WARN] No se pudieron eliminar las columnas de texto de bookings; se mantiene la doble escritura: {e}")
+        return False
+
+
+def migrate_booking_dimensions(db: Session) -> None:
+    """Pasa user_name/user_email/area de bookings a las tablas requesters y areas.
+
+    Se hace en dos versiones para los despliegues escalonados (la versión
+    anterior sigue escribiendo las columnas de texto mientras convive con esta):
+    1. Esta versión añade requester_id/area_id, rellena en cada arranque las
+       filas que aún no los tienen y sigue escribiendo también las columnas de
+       texto (write_legacy_booking_columns).
+    2. Cuando ya no queda ninguna instancia anterior, DROP_LEGACY_BOOKING_COLUMNS=true
+       elimina las columnas de texto y sus índices en una sola transacción.
+    """
+    global legacy_columns_present
+    for sql in [
+        "ALTER TABLE bookings ADD COLUMN requester_id INTEGER REFERENCES requesters(id)",
+        "ALTER TABLE bookings ADD COLUMN area_id INTEGER REFERENCES areas(id)",
+    ]:
+        _try(db, sql)
+    _try(db, "CREATE INDEX IF NOT EXISTS ix_bookings_requester_id ON bookings (requester_id)")
+    _try(db, "CREATE INDEX IF NOT EXISTS ix_bookings_area_id ON bookings (area_id)")
+
+    legacy_columns_present = "user_name" in _booking_columns(db)
+    if not legacy_columns_present:
+        return
+
+    _backfill_dimensions(db)
+    db.commit()
+
+    if os.getenv("DROP_LEGACY_BOOKING_COLUMNS", "false").strip().lower() == "true":
+        print("[INFO] Eliminando las columnas de texto de bookings...")
+        if _drop_legacy_columns(db):
+            legacy_columns_present = False
+            print("[INFO] Columnas user_name/user_email/area eliminadas.")
+
+
+def write_legacy_booking_columns(db: Session, booking) -> None:
+    """Doble escritura: copia responsable y área a las columnas de texto.
+
+    Solo mientras existan (ver migrate_booking_dimensions), para que la versión
+    anterior siga leyendo las reservas creadas o editadas por esta.
+    """
+    if not legacy_columns_present:
+        return
+    db.flush()
+    db.execute(
+        text("UPDATE bookings SET user_name = :name, user_email = :email, area = :area WHERE id = :id"),
+        {"name": booking.user_name, "email": booking.user_email, "area": booking.area, "id": booking.id},
+    )
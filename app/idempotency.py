@@ -0,0 +1,141 @@
+"""
+Supresión de envíos duplicados en los POST de reservas.
+
+El cliente manda una clave única por intento de envío, en la cabecera
+`Idempotency-Key` (calendar.js) o en el campo oculto `idempotency_key`
+(formularios del admin). La primera petición con esa clave se ejecuta y su
+respuesta se guarda en `idempotency_keys` durante IDEMPOTENCY_TTL_SECONDS:
+- Reintentos con la misma clave y el mismo cuerpo reciben la respuesta
+  guardada sin volver a validar, escribir reservas ni encolar correos.
+- Si la original sigue en curso, el duplicado espera (hasta
+  IDEMPOTENCY_WAIT_SECONDS) y luego recibe la misma respuesta.
+- La misma clave con otro cuerpo se rechaza con 422.
+
+Los errores 5xx no se guardan: la clave se libera y el cliente puede reintentar.
+"""
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+from urllib.parse import parse_qs
+
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .database.db import SessionLocal
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_FIELD = "idempotency_key"
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+# Una petición "en curso" más antigua que esto se da por perdida (worker caído)
+PENDING_TIMEOUT_SECONDS = 60
+MAX_KEY_LENGTH = 200
+
+_FORM_URLENCODED = "application/x-www-form-urlencoded"
+
+
+def new_key() -> str:
+    """Clave nueva para el campo oculto de un formulario."""
+    return secrets.token_urlsafe(16)
+
+
+def wants_body(headers) -> bool:
+    """Si hace falta leer el cuerpo para buscar la clave (o calcular la huella)."""
+    return IDEMPOTENCY_HEADER in headers or headers.get("content-type", "").startswith(_FORM_URLENCODED)
+
+
+def client_key(headers, body: bytes) -> Optional[str]:
+    key = headers.get(IDEMPOTENCY_HEADER)
+    if key is None and headers.get("content-type", "").startswith(_FORM_URLENCODED):
+        values = parse_qs(body.decode("latin-1")).get(IDEMPOTENCY_FIELD)
+        key = values[0] if values else None
+    return key.strip() if key else None
+
+
+def fingerprint(content_type: str, body: bytes) -> str:
+    # El boundary de multipart cambia en cada envío del mismo FormData
+    if "boundary=" in content_type:
+        boundary = content_type.split("boundary=", 1)[1].split(";", 1)[0].strip('"')
+        body = body.replace(boundary.encode("latin-1"), b"")
+    return hashlib.sha256(body).hexdigest()
+
+
+def claim(key: str, request_fingerprint: str) -> tuple[str, Optional[models.IdempotencyKey]]:
+    """Reserva la clave para esta petición.
+
+    Devuelve ("new", None) si la petición debe ejecutarse, o el estado de la
+    existente: "replay" (respuesta guardada), "pending" (en curso) o
+    "mismatch" (misma clave, otro cuerpo).
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db.query(models.IdempotencyKey).filter(models.IdempotencyKey.expires_at < now).delete(
+            synchronize_session=False
+        )
+        try:
+            db.add(models.IdempotencyKey(
+                key=key,
+                fingerprint=request_fingerprint,
+                created_at=now,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+            ))
+            db.commit()
+            return "new", None
+        except IntegrityError:
+            db.rollback()
+
+        record = db.query(models.IdempotencyKey).filter(models.IdempotencyKey.key == key).first()
+        if record is None:
+            # Se liberó entre el INSERT y la consulta: quien llama reintenta
+            return "pending", None
+        if record.fingerprint != request_fingerprint:
+            return "mismatch", record
+        if record.status_code is not None:
+            return "replay", record
+
+        taken = (
+            db.query(models.IdempotencyKey)
+            .filter(
+                models.IdempotencyKey.id == record.id,
+                models.IdempotencyKey.status_code.is_(None),
+                models.IdempotencyKey.created_at < now - timedelta(seconds=PENDING_TIMEOUT_SECONDS),
+            )
+            .update({"created_at": now}, synchronize_session=False)
+        )
+        db.commit()
+        return ("new", None) if taken else ("pending", record)
+    finally:
+        db.close()
+
+
+def complete(key: str, status_code: int, content_type: Optional[str], location: Optional[str], body: bytes) -> None:
+    db = SessionLocal()
+    try:
+        db.query(models.IdempotencyKey).filter(models.IdempotencyKey.key == key).update(
+            {
+                "status_code": status_code,
+                "content_type": content_type,
+                "location": location,
+                "body": body,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def release(key: str) -> None:
+    """Libera una clave cuya petición falló para que pueda reintentarse."""
+    db = SessionLocal()
+    try:
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.status_code.is_(None),
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,122 @@
+"""
+Envío de correo vía Gmail API (OAuth2) — funciona en Railway, no usa SMTP saliente.
+
+Los clientes de Google y los módulos MIME se importan dentro de las
+funciones: cargarlos al importar la app añade ~0.25 s al arranque y solo se
+necesitan cuando se envía el primer correo.
+"""
+import base64
+import os
+import threading
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader
+
+_template_env = Environment(loader=FileSystemLoader(str(Path(__file__).parent / "templates")))
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def _str_to_bool(value: str | None, default: bool = False) -> bool:
+    if value is None:
+        return default
+    return value.strip().lower() in ("true", "1", "yes")
+
+
+def mail_enabled() -> bool:
+    return _str_to_bool(os.getenv("MAIL_ENABLED"), default=False)
+
+
+def mail_sender() -> str:
+    return os.getenv("MAIL_FROM", os.getenv("MAIL_USERNAME"))
+
+
+def _build_gmail_service():
+    """Construye el cliente de la Gmail API usando el Refresh Token del entorno."""
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
+
+    creds = Credentials(
+        token=None,
+        refresh_token=os.getenv("GMAIL_REFRESH_TOKEN"),
+        client_id=os.getenv("GMAIL_CLIENT_ID"),
+        client_secret=os.getenv("GMAIL_CLIENT_SECRET"),
+        token_uri="https://oauth2.googleapis.com/token",
+    )
+    return build("gmail", "v1", credentials=creds, cache_discovery=False)
+
+
+def get_gmail_service():
+    """Cliente de la Gmail API compartido (se construye una vez por proceso).
+
+    El cliente no es thread-safe: usarlo solo desde un hilo (el del scheduler).
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = _build_gmail_service()
+        return _service
+
+
+def _render_email_template(template_name: str, context: dict) -> str:
+    """Renderiza una plantilla Jinja2 y devuelve el HTML como string."""
+    return _template_env.get_template(template_name).render(**context)
+
+
+def _create_mime_message(sender: str, to: str, subject: str, html_body: str) -> dict:
+    """Crea el mensaje MIME codificado en base64 para la Gmail API."""
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = sender
+    msg["To"] = to
+    msg.attach(MIMEText(html_body, "html"))
+    raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
+    return {"raw": raw}
+
+
+def send_batch(messages: list[dict]) -> list[str | None]:
+    """Envía varios mensajes MIME en una sola petición batch de la Gmail API.
+
+    Devuelve, en el mismo orden, None si el mensaje se envió o el error.
+    """
+    service = get_gmail_service()
+    errors: dict[str, str | None] = {}
+
+    def _callback(request_id, response, exception):
+        errors[request_id] = str(exception) if exception else None
+
+    batch = service.new_batch_http_request(callback=_callback)
+    for i, message in enumerate(messages):
+        batch.add(service.users().messages().send(userId="me", body=message), request_id=str(i))
+    batch.execute()
+    return [errors.get(str(i), "sin respuesta") for i in range(len(messages))]
+
+
+async def send_booking_email(booking_data: dict, email_to: str):
+    """Envía el correo de confirmación usando la Gmail API (OAuth2).
+
+    Respeta MAIL_ENABLED: si es False, omite el envío silenciosamente.
+    """
+    if not mail_enabled():
+        print("[INFO] Envío de correo deshabilitado (MAIL_ENABLED=False).")
+        return
+
+    from googleapiclient.errors import HttpError
+
+    sender = mail_sender()
+    subject = f"Confirmación de Reserva: {booking_data['room_name']}"
+
+    try:
+        html_body = _render_email_template("email_booking.html", booking_data)
+        service = _build_gmail_service()
+        message = _create_mime_message(sender, email_to, subject, html_body)
+        service.users().messages().send(userId="me", body=message).execute()
+        print(f"[INFO] Correo enviado vía Gmail API a {email_to}")
+    except HttpError as e:
+        print(f"[ERROR] Gmail API HttpError al enviar a {email_to}: {e}")
+    except Exception as e:
+        print(f"[ERROR] No se pudo enviar el correo a {email_to}: {e}")
@@ -1,111 +1,264 @@
 from datetime import date, datetime, time, timedelta
-import base64
+import asyncio
+import hashlib
 import os
 import secrets
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from pathlib import Path
+import threading
+from email.utils import format_datetime, parsedate_to_datetime
+import time as _time
 from typing import List, Optional
 
-from fastapi import BackgroundTasks, Depends, FastAPI, Form, HTTPException, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import BackgroundTasks, Depends, FastAPI, Form, HTTPException, Query, Request
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from jinja2 import Environment, FileSystemLoader
-from sqlalchemy import text
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from . import models, schemas
+from . import idempotency, models, render_cache, schemas
 from .auth import (
     create_session_token,
     get_current_admin,
     hash_password,
     verify_password,
 )
+from .calendar_feed import feed_validators, get_room_feed
 from .config import load_environment
-from .database.db import Base, engine, get_db
+from .mailer import send_booking_email
+from .reminders import start_scheduler, stop_scheduler
+from .search import apply_text_search, ensure_search_index
+from .database.db import (
+    PRIMARY_STICKY_COOKIE,
+    READ_YOUR_WRITES_SECONDS,
+    Base,
+    engine,
+    get_db,
+    get_read_db,
+    replica_engine,
+)
+from .database.migrations import migrate_booking_dimensions, write_legacy_booking_columns
 
 load_environment()
 
 # ---------------------------------------------------------------------------
-# Gmail API — envío via OAuth2 (funciona en Railway, no usa SMTP saliente)
+# App FastAPI
 # ---------------------------------------------------------------------------
+app = FastAPI(title="CHVS - Sala de Juntas")
+
+# Archivos estaticos y plantillas
+app.mount("/static", StaticFiles(directory="app/static"), name="static")
+templates = Jinja2Templates(directory="app/templates")
+render_cache.install(templates.env)
+templates.env.globals["new_idempotency_key"] = idempotency.new_key
 
-def _str_to_bool(value: str | None, default: bool = False) -> bool:
-    if value is None:
-        return default
-    return value.strip().lower() in ("true", "1", "yes")
+# ---------------------------------------------------------------------------
+# Arranque en dos fases
+#
+# El worker acepta conexiones de inmediato; create_all, migraciones y seed se
+# ejecutan en un hilo aparte. Hasta que terminan, /readyz responde 503 y las
+# rutas que usan la base de datos esperan (con límite) a que esté lista.
+# ---------------------------------------------------------------------------
 
+_startup_ready = threading.Event()
+_startup_error: Optional[str] = None
 
-def _build_gmail_service():
-    """Construye el cliente de la Gmail API usando el Refresh Token del entorno."""
-    creds = Credentials(
-        token=None,
-        refresh_token=os.getenv("GMAIL_REFRESH_TOKEN"),
-        client_id=os.getenv("GMAIL_CLIENT_ID"),
-        client_secret=os.getenv("GMAIL_CLIENT_SECRET"),
-        token_uri="https://oauth2.googleapis.com/token",
-    )
-    return build("gmail", "v1", credentials=creds, cache_discovery=False)
+STARTUP_WAIT_SECONDS = float(os.getenv("STARTUP_WAIT_SECONDS", "30"))
+
+# Rutas que no dependen de la base de datos y se sirven antes de estar listos
+_READINESS_EXEMPT_PREFIXES = ("/healthz", "/readyz", "/static", "/sw.js")
+
+
+STARTUP_ATTEMPTS = 5
+# Código de salida de gunicorn para "el worker no pudo arrancar": el master se
+# detiene en lugar de relanzar el worker en bucle, y Railway (ON_FAILURE)
+# reinicia el servicio. Con uvicorn solo, el proceso termina con error.
+STARTUP_FAILURE_EXIT_CODE = 3
+
+
+def _run_startup_tasks():
+    # Con varios workers (gunicorn.conf.py) todos inicializan en paralelo y uno
+    # puede chocar con el seed de otro; también la BD puede tardar en aceptar
+    # conexiones tras un reinicio. Se reintenta con espera creciente.
+    global _startup_error
+    for attempt in range(1, STARTUP_ATTEMPTS + 1):
+        try:
+            startup_db_seed()
+        except Exception as e:
+            _startup_error = str(e)
+            print(f"[WARN] Inicialización de la base de datos fallida (intento {attempt}): {e}")
+            _time.sleep(attempt)
+        else:
+            _startup_error = None
+            _startup_ready.set()
+            print("[INFO] Inicialización de la base de datos completada.")
+            start_scheduler()
+            return
+    print(f"[ERROR] Falló la inicialización de la base de datos: {_startup_error}", flush=True)
+    os._exit(STARTUP_FAILURE_EXIT_CODE)
+
+
+@app.on_event("startup")
+def start_background_init():
+    """Lanza la inicialización de la base de datos sin bloquear el arranque."""
+    threading.Thread(target=_run_startup_tasks, name="startup-db-seed", daemon=True).start()
+
+
+@app.on_event("shutdown")
+def shutdown_scheduler():
+    stop_scheduler()
 
 
-def _render_email_template(template_name: str, context: dict) -> str:
-    """Renderiza una plantilla Jinja2 y devuelve el HTML como string."""
-    template_dir = Path(__file__).parent / "templates"
-    env = Environment(loader=FileSystemLoader(str(template_dir)))
-    template = env.get_template(template_name)
-    return template.render(**context)
+class IdempotentReplay(Exception):
+    """La petición repite una Idempotency-Key ya resuelta: se devuelve la respuesta guardada."""
 
+    def __init__(self, record: models.IdempotencyKey):
+        self.record = record
 
-def _create_mime_message(sender: str, to: str, subject: str, html_body: str) -> dict:
-    """Crea el mensaje MIME codificado en base64 para la Gmail API."""
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = sender
-    msg["To"] = to
-    msg.attach(MIMEText(html_body, "html"))
-    raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
-    return {"raw": raw}
+
+@app.exception_handler(IdempotentReplay)
+async def idempotent_replay(request: Request, exc: IdempotentReplay):
+    headers = {"Idempotent-Replayed": "true"}
+    if exc.record.location:
+        headers["Location"] = exc.record.location
+    return Response(
+        content=exc.record.body,
+        status_code=exc.record.status_code,
+        media_type=exc.record.content_type,
+        headers=headers,
+    )
 
 
-async def send_booking_email(booking_data: dict, email_to: str):
-    """Envía el correo de confirmación usando la Gmail API (OAuth2).
+async def idempotent_request(request: Request) -> None:
+    """Dependencia: reserva la Idempotency-Key de la petición (app/idempotency.py).
 
-    Respeta MAIL_ENABLED: si es False, omite el envío silenciosamente.
+    Se declara en la firma de la ruta después de get_current_admin: una
+    petición sin sesión nunca reserva la clave (su redirección al login no se
+    guarda) y una repetición solo se responde a quien está autenticado.
     """
-    if not _str_to_bool(os.getenv("MAIL_ENABLED"), default=False):
-        print("[INFO] Envío de correo deshabilitado (MAIL_ENABLED=False).")
+    key = getattr(request.state, "idempotency_key", None)
+    if key is None:
         return
+    deadline = _time.monotonic() + idempotency.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        state, record = await asyncio.to_thread(idempotency.claim, key, request.state.idempotency_fingerprint)
+        if state == "new":
+            request.state.idempotency_claimed = True
+            return
+        if state == "replay":
+            raise IdempotentReplay(record)
+        if state == "mismatch":
+            raise HTTPException(status_code=422, detail="La Idempotency-Key ya se usó con otros datos.")
+        if _time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=409,
+                detail="La misma solicitud aún se está procesando, intente de nuevo.",
+                headers={"Retry-After": "2"},
+            )
+        await asyncio.sleep(0.2)
+
 
-    sender = os.getenv("MAIL_FROM", os.getenv("MAIL_USERNAME"))
-    subject = f"Confirmación de Reserva: {booking_data['room_name']}"
+# Se declara antes que los demás middlewares para quedar por dentro de ellos:
+# corre con la base de datos ya lista y las respuestas repetidas también pasan
+# por read_your_writes.
+@app.middleware("http")
+async def idempotent_posts(request: Request, call_next):
+    """Guarda la respuesta de los POST cuya clave reservó idempotent_request.
 
+    Aquí solo se lee la clave del cuerpo; la reserva ocurre dentro de la ruta,
+    así que las peticiones que no llegan al handler (p. ej. sesión vencida)
+    no dejan nada guardado.
+    """
+    if request.method != "POST" or not idempotency.wants_body(request.headers):
+        return await call_next(request)
+    body = await request.body()
+    client_key = idempotency.client_key(request.headers, body)
+    if not client_key:
+        return await call_next(request)
+    if len(client_key) > idempotency.MAX_KEY_LENGTH:
+        return JSONResponse(status_code=400, content={"detail": "Idempotency-Key demasiado larga."})
+
+    key = f"{request.url.path}:{client_key}"
+    request.state.idempotency_key = key
+    request.state.idempotency_fingerprint = idempotency.fingerprint(request.headers.get("content-type", ""), body)
     try:
-        html_body = _render_email_template("email_booking.html", booking_data)
-        service = _build_gmail_service()
-        message = _create_mime_message(sender, email_to, subject, html_body)
-        service.users().messages().send(userId="me", body=message).execute()
-        print(f"[INFO] Correo enviado vía Gmail API a {email_to}")
-    except HttpError as e:
-        print(f"[ERROR] Gmail API HttpError al enviar a {email_to}: {e}")
-    except Exception as e:
-        print(f"[ERROR] No se pudo enviar el correo a {email_to}: {e}")
+        response = await call_next(request)
+    except Exception:
+        if getattr(request.state, "idempotency_claimed", False):
+            await asyncio.to_thread(idempotency.release, key)
+        raise
+    if not getattr(request.state, "idempotency_claimed", False):
+        return response
+    if response.status_code >= 500:
+        await asyncio.to_thread(idempotency.release, key)
+        return response
+
+    content = b"".join([chunk async for chunk in response.body_iterator])
+    await asyncio.to_thread(
+        idempotency.complete,
+        key,
+        response.status_code,
+        response.headers.get("content-type"),
+        response.headers.get("location"),
+        content,
+    )
 
+    async def _body():
+        yield content
 
-# ---------------------------------------------------------------------------
-# App FastAPI
-# ---------------------------------------------------------------------------
-app = FastAPI(title="CHVS - Sala de Juntas")
+    response.body_iterator = _body()
+    return response
 
-# Archivos estaticos y plantillas
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+
+@app.middleware("http")
+async def wait_until_ready(request: Request, call_next):
+    """Retiene las peticiones hasta que la inicialización haya terminado."""
+    if not _startup_ready.is_set() and not request.url.path.startswith(_READINESS_EXEMPT_PREFIXES):
+        ready = await asyncio.to_thread(_startup_ready.wait, STARTUP_WAIT_SECONDS)
+        if not ready:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "El servicio se está iniciando, intente de nuevo."},
+                headers={"Retry-After": "5"},
+            )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """Tras una escritura, marca al cliente para leer de la principal un momento."""
+    response = await call_next(request)
+    if (
+        replica_engine is not engine
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            PRIMARY_STICKY_COOKIE,
+            "1",
+            max_age=READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: el proceso está vivo y atendiendo peticiones."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: la base de datos está inicializada y la app puede recibir tráfico."""
+    if _startup_ready.is_set():
+        return {"status": "ready"}
+    # El detalle del error solo va al log: /readyz es público
+    content = {"status": "error" if _startup_error else "starting"}
+    return JSONResponse(status_code=503, content=content)
 
 
-@app.on_event("startup")
 def startup_db_seed():
     """Crea tablas, salas y el usuario admin por defecto si no existen."""
     Base.metadata.create_all(bind=engine)
@@ -118,6 +271,12 @@ def startup_db_seed():
             "ALTER TABLE bookings ADD COLUMN attendees INTEGER DEFAULT 1",
             "ALTER TABLE bookings ADD COLUMN cancel_token VARCHAR(64)",
             "ALTER TABLE bookings ADD COLUMN cancel_token_expires_at TIMESTAMP",
+            "ALTER TABLE rooms ADD COLUMN bookings_version INTEGER DEFAULT 0",
+            "ALTER TABLE rooms ADD COLUMN bookings_updated_at TIMESTAMP",
+            "UPDATE rooms SET bookings_updated_at = CURRENT_TIMESTAMP WHERE bookings_updated_at IS NULL",
+            "CREATE INDEX IF NOT EXISTS ix_bookings_date_start_time ON bookings (date, start_time)",
+            "CREATE INDEX IF NOT EXISTS ix_bookings_room_date_start_time ON bookings (room_id, date, start_time)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_bookings_cancel_token ON bookings (cancel_token)",
         ]:
             try:
                 db.execute(text(sql))
@@ -125,6 +284,12 @@ def startup_db_seed():
             except Exception:
                 db.rollback()
 
+        # Responsables y áreas en tablas de dimensión (backfill de datos antiguos)
+        migrate_booking_dimensions(db)
+
+        # Índices de búsqueda de texto (FTS5 en SQLite, pg_trgm en PostgreSQL)
+        ensure_search_index(db)
+
         # Seed de salas
         if db.query(models.Room).count() == 0:
             rooms = [
@@ -171,23 +336,290 @@ def startup_db_seed():
 # Rutas públicas
 # ---------------------------------------------------------------------------
 
-@app.get("/")
-def read_root(request: Request, db: Session = Depends(get_db)):
-    rooms = db.query(models.Room).all()
-    return templates.TemplateResponse(
-        "index.html",
-        {"request": request, "rooms": rooms, "now": date.today().isoformat()},
+# Catálogo de salas para las plantillas (cambia casi nunca)
+ROOMS_SNAPSHOT_SECONDS = int(os.getenv("ROOMS_SNAPSHOT_SECONDS", "30"))
+_rooms_snapshot: Optional[tuple[float, list, tuple]] = None
+
+
+def _cached_rooms(db: Session) -> tuple[list, tuple]:
+    """Salas (schemas.Room) y su versión, releídas como mucho cada ROOMS_SNAPSHOT_SECONDS.
+
+    La versión solo depende de lo que se renderiza (nombre, descripción, color,
+    capacidad), no de bookings_version: crear reservas no invalida las vistas.
+    """
+    global _rooms_snapshot
+    snapshot = _rooms_snapshot
+    if snapshot and _time.monotonic() - snapshot[0] < ROOMS_SNAPSHOT_SECONDS:
+        return snapshot[1], snapshot[2]
+    rooms = [schemas.Room.model_validate(r) for r in db.query(models.Room).order_by(models.Room.id)]
+    version = render_cache.data_version(rooms, "id", "name", "description", "color", "capacity")
+    _rooms_snapshot = (_time.monotonic(), rooms, version)
+    return rooms, version
+
+
+@app.get("/", response_class=HTMLResponse)
+def read_root(db: Session = Depends(get_read_db)):
+    rooms, rooms_version = _cached_rooms(db)
+    today = date.today().isoformat()
+    html = render_cache.page_cache.get_or_render(
+        ("index.html", rooms_version, today),
+        lambda: templates.get_template("index.html").render(
+            rooms=rooms, rooms_version=rooms_version, now=today
+        ),
     )
+    return HTMLResponse(html)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+
+def _json_etag(*parts) -> str:
+    return '"' + hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20] + '"'
 
 
 @app.get("/api/bookings", response_model=List[schemas.Booking])
-def get_bookings(db: Session = Depends(get_db)):
-    return db.query(models.Booking).all()
+def get_bookings(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    """Reservas, opcionalmente del rango [start, end) que muestra el calendario.
+
+    El ETag sale de las versiones de las salas (cualquier escritura de reservas
+    las incrementa), así que un If-None-Match vigente responde 304 sin leer
+    las reservas.
+    """
+    versions = db.query(models.Room.id, models.Room.bookings_version).order_by(models.Room.id).all()
+    etag = _json_etag("bookings", start, end, [tuple(v) for v in versions])
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    query = db.query(models.Booking)
+    if start:
+        query = query.filter(models.Booking.date >= start)
+    if end:
+        query = query.filter(models.Booking.date < end)
+    response.headers.update(headers)
+    return query.all()
 
 
 @app.get("/api/rooms", response_model=List[schemas.Room])
-def get_rooms(db: Session = Depends(get_db)):
-    return db.query(models.Room).all()
+def get_rooms(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    rooms, rooms_version = _cached_rooms(db)
+    etag = _json_etag("rooms", rooms_version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return rooms
+
+
+@app.get("/sw.js", include_in_schema=False)
+def service_worker():
+    """Service worker del calendario; se sirve en la raíz para controlar `/`."""
+    return FileResponse(
+        "app/static/js/sw.js",
+        media_type="application/javascript",
+        headers={"Cache-Control": "no-cache", "Service-Worker-Allowed": "/"},
+    )
+
+
+@app.get("/rooms/{room_id}/calendar.ics")
+def room_calendar_feed(room_id: int, request: Request, db: Session = Depends(get_read_db)):
+    """Feed iCalendar de la sala para suscripción desde Outlook / Google Calendar."""
+    room = db.query(models.Room).filter(models.Room.id == room_id).first()
+    if room is None:
+        raise HTTPException(status_code=404, detail="La sala seleccionada no existe.")
+
+    etag, last_modified = feed_validators(room)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "public, max-age=300",
+    }
+
+    # Los 304 se resuelven solo con la fila de la sala, antes de construir el feed
+    if_modified_since = request.headers.get("if-modified-since")
+    if request.headers.get("if-none-match") is not None:
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since:
+        try:
+            if last_modified <= parsedate_to_datetime(if_modified_since):
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    feed = get_room_feed(db, room)
+    return Response(
+        content=feed.body,
+        media_type="text/calendar; charset=utf-8",
+        headers={**headers, "Content-Disposition": f'inline; filename="sala-{room.id}.ics"'},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Búsqueda de disponibilidad entre todas las salas
+# ---------------------------------------------------------------------------
+
+BOOKING_DAY_START = time(7, 0)
+BOOKING_DAY_END = time(17, 0)
+MAX_ALTERNATIVES = 5
+
+
+def _to_minutes(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _from_minutes(m: int) -> time:
+    return time(m // 60, m % 60)
+
+
+def _free_gaps(busy: List[tuple]) -> List[tuple]:
+    """Huecos libres (en minutos) dentro del horario, dadas las reservas ordenadas."""
+    gaps = []
+    cursor = _to_minutes(BOOKING_DAY_START)
+    for start, end in busy:
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    day_end = _to_minutes(BOOKING_DAY_END)
+    if cursor < day_end:
+        gaps.append((cursor, day_end))
+    return gaps
+
+
+@app.get("/api/rooms/search", response_model=schemas.RoomSearchResult)
+def search_rooms(
+    booking_date: str = Query(..., alias="date"),
+    start: str = Query(...),
+    end: str = Query(...),
+    attendees: int = 1,
+    db: Session = Depends(get_read_db),
+):
+    """Salas con capacidad suficiente libres en el intervalo pedido.
+
+    Se cargan las reservas del día de todas las salas en una sola consulta y
+    se resuelve en memoria; si ninguna sala está libre se proponen las
+    franjas más cercanas de la misma duración.
+    """
+    try:
+        date_obj = date.fromisoformat(booking_date)
+        start_obj = time.fromisoformat(start)
+        end_obj = time.fromisoformat(end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Fecha u hora con formato inválido.")
+
+    if start_obj < BOOKING_DAY_START or end_obj > BOOKING_DAY_END or start_obj >= end_obj:
+        raise HTTPException(
+            status_code=400,
+            detail="Horario fuera del rango permitido (7:00 AM - 5:00 PM)",
+        )
+    if attendees < 1:
+        raise HTTPException(status_code=400, detail="Número de asistentes inválido.")
+
+    rooms = (
+        db.query(models.Room)
+        .filter((models.Room.capacity.is_(None)) | (models.Room.capacity >= attendees))
+        .order_by(models.Room.capacity, models.Room.id)
+        .all()
+    )
+
+    busy_by_room = {room.id: [] for room in rooms}
+    day_bookings = (
+        db.query(models.Booking.room_id, models.Booking.start_time, models.Booking.end_time)
+        .filter(models.Booking.date == date_obj)
+        .order_by(models.Booking.start_time)
+        .all()
+    )
+    for room_id, b_start, b_end in day_bookings:
+        if room_id in busy_by_room:
+            busy_by_room[room_id].append((_to_minutes(b_start), _to_minutes(b_end)))
+
+    req_start, req_end = _to_minutes(start_obj), _to_minutes(end_obj)
+    available = [
+        room
+        for room in rooms
+        if all(b_end <= req_start or b_start >= req_end for b_start, b_end in busy_by_room[room.id])
+    ]
+
+    alternatives = []
+    if not available:
+        duration = req_end - req_start
+        candidates = []
+        for room in rooms:
+            for gap_start, gap_end in _free_gaps(busy_by_room[room.id]):
+                if gap_end - gap_start < duration:
+                    continue
+                slot_start = min(max(req_start, gap_start), gap_end - duration)
+                candidates.append((abs(slot_start - req_start), slot_start, room))
+        candidates.sort(key=lambda c: (c[0], c[1], c[2].id))
+        alternatives = [
+            schemas.AlternativeSlot(
+                room_id=room.id,
+                room_name=room.name,
+                start_time=_from_minutes(slot_start),
+                end_time=_from_minutes(slot_start + duration),
+            )
+            for _, slot_start, room in candidates[:MAX_ALTERNATIVES]
+        ]
+
+    return schemas.RoomSearchResult(
+        date=date_obj,
+        start_time=start_obj,
+        end_time=end_obj,
+        attendees=attendees,
+        available_rooms=available,
+        alternatives=alternatives,
+    )
+
+
+def _touch_rooms(db: Session, *room_ids: int):
+    """Marca las salas como modificadas (invalida feeds y cachés que dependen de ellas)."""
+    db.query(models.Room).filter(models.Room.id.in_(set(room_ids))).update(
+        {
+            models.Room.bookings_version: func.coalesce(models.Room.bookings_version, 0) + 1,
+            models.Room.bookings_updated_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+
+
+def _intern_area(db: Session, name: str) -> models.Area:
+    """Devuelve el Area con ese nombre, creándola si no existe."""
+    area = db.query(models.Area).filter(models.Area.name == name).first()
+    if area is None:
+        try:
+            with db.begin_nested():
+                area = models.Area(name=name)
+                db.add(area)
+        except IntegrityError:
+            # Otra petición la creó en paralelo
+            area = db.query(models.Area).filter(models.Area.name == name).one()
+    return area
+
+
+def _intern_requester(db: Session, name: str, email: str) -> models.Requester:
+    """Devuelve el Requester con ese nombre y correo, creándolo si no existe."""
+    query = db.query(models.Requester).filter(
+        models.Requester.email == email, models.Requester.name == name
+    )
+    requester = query.first()
+    if requester is None:
+        try:
+            with db.begin_nested():
+                requester = models.Requester(name=name, email=email)
+                db.add(requester)
+        except IntegrityError:
+            requester = query.one()
+    return requester
 
 
 @app.post("/api/bookings")
@@ -203,6 +635,7 @@ async def create_booking(
     room_id: int = Form(...),
     attendees: int = Form(...),
     db: Session = Depends(get_db),
+    idempotency_claim: None = Depends(idempotent_request),
 ):
     # Convertir strings a objetos date/time
     date_obj = date.fromisoformat(booking_date)
@@ -250,9 +683,8 @@ async def create_booking(
     cancel_token_expires_at = datetime.utcnow() + timedelta(hours=48)
 
     new_booking = models.Booking(
-        user_name=user_name,
-        user_email=user_email,
-        area=area,
+        requester=_intern_requester(db, user_name, user_email),
+        area_ref=_intern_area(db, area),
         date=date_obj,
         start_time=start_obj,
         end_time=end_obj,
@@ -262,6 +694,8 @@ async def create_booking(
         cancel_token_expires_at=cancel_token_expires_at,
     )
     db.add(new_booking)
+    write_legacy_booking_columns(db, new_booking)
+    _touch_rooms(db, room_id)
     db.commit()
     db.refresh(new_booking)
 
@@ -278,7 +712,10 @@ async def create_booking(
     }
     background_tasks.add_task(send_booking_email, email_data, user_email)
 
-    return {"message": "Reserva creada con exito", "booking": new_booking}
+    return {
+        "message": "Reserva creada con exito",
+        "booking": schemas.BookingCreated.model_validate(new_booking),
+    }
 
 
 # ---------------------------------------------------------------------------
@@ -327,50 +764,139 @@ def admin_logout():
 # Panel de administración (protegido)
 # ---------------------------------------------------------------------------
 
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 200
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _search_bookings(
+    db: Session,
+    q: Optional[str] = None,
+    sala: Optional[int] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    page: int = 1,
+    page_size: int = ADMIN_PAGE_SIZE,
+) -> schemas.BookingPage:
+    """Búsqueda paginada de reservas para el panel admin."""
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), ADMIN_MAX_PAGE_SIZE)
+
+    query = db.query(models.Booking)
+    if q:
+        query = apply_text_search(query, db, q)
+    desde_date, hasta_date = _parse_date(desde), _parse_date(hasta)
+    if desde_date:
+        query = query.filter(models.Booking.date >= desde_date)
+    if hasta_date:
+        query = query.filter(models.Booking.date <= hasta_date)
+
+    # Conteo por sala sobre los filtros de texto y fecha (tarjetas de resumen)
+    room_counts = dict(
+        query.with_entities(models.Booking.room_id, func.count(models.Booking.id))
+        .group_by(models.Booking.room_id)
+        .all()
+    )
+    if sala:
+        query = query.filter(models.Booking.room_id == sala)
+        total = room_counts.get(sala, 0)
+    else:
+        total = sum(room_counts.values())
+
+    items = (
+        query.order_by(models.Booking.date.desc(), models.Booking.start_time, models.Booking.id)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+    return schemas.BookingPage(
+        items=items,
+        total=total,
+        page=page,
+        page_size=page_size,
+        pages=max((total + page_size - 1) // page_size, 1),
+        room_counts=room_counts,
+    )
+
+
 @app.get("/admin")
 def admin_dashboard(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: str = Depends(get_current_admin),
     sala: Optional[int] = None,
     fecha: Optional[str] = None,
+    q: Optional[str] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    page: int = 1,
 ):
-    query = db.query(models.Booking)
-    if sala:
-        query = query.filter(models.Booking.room_id == sala)
-    if fecha:
-        try:
-            query = query.filter(models.Booking.date == date.fromisoformat(fecha))
-        except ValueError:
-            pass
-    bookings = query.order_by(models.Booking.date.desc(), models.Booking.start_time).all()
+    # `fecha` (día exacto) se mantiene por compatibilidad con enlaces antiguos
+    if fecha and not (desde or hasta):
+        desde = hasta = fecha
+    result = _search_bookings(db, q=q, sala=sala, desde=desde, hasta=hasta, page=page)
     rooms = db.query(models.Room).all()
     return templates.TemplateResponse(
         "admin_dashboard.html",
         {
             "request": request,
-            "bookings": bookings,
+            "bookings": result.items,
+            "result": result,
             "rooms": rooms,
+            # Las filas se cachean por (reserva, sala, versión de reservas de la sala)
+            "room_versions": {r.id: r.bookings_version or 0 for r in rooms},
             "admin_user": current_admin,
             "filter_sala": sala,
-            "filter_fecha": fecha,
+            "filter_q": q,
+            "filter_desde": desde,
+            "filter_hasta": hasta,
         },
     )
 
 
+@app.get("/admin/api/bookings", response_model=schemas.BookingPage)
+def admin_search_bookings(
+    db: Session = Depends(get_read_db),
+    current_admin: str = Depends(get_current_admin),
+    q: Optional[str] = None,
+    sala: Optional[int] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    page: int = 1,
+    page_size: int = ADMIN_PAGE_SIZE,
+):
+    """Búsqueda de reservas (texto libre + rango de fechas) en JSON paginado."""
+    return _search_bookings(db, q=q, sala=sala, desde=desde, hasta=hasta, page=page, page_size=page_size)
+
+
+@app.get("/admin/api/cache-stats")
+def admin_cache_stats(current_admin: str = Depends(get_current_admin)):
+    """Aciertos/fallos de la caché de plantillas de este worker."""
+    return render_cache.stats()
+
+
 @app.get("/admin/bookings/new")
 def admin_new_booking_form(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: str = Depends(get_current_admin),
 ):
-    rooms = db.query(models.Room).all()
+    rooms, rooms_version = _cached_rooms(db)
     return templates.TemplateResponse(
         "admin_edit_booking.html",
         {
             "request": request,
             "booking": None,
             "rooms": rooms,
+            "rooms_version": rooms_version,
             "admin_user": current_admin,
             "action": "/admin/bookings/new",
             "title": "Nueva Reserva",
@@ -392,6 +918,7 @@ def admin_create_booking(
     attendees: int = Form(...),
     db: Session = Depends(get_db),
     current_admin: str = Depends(get_current_admin),
+    idempotency_claim: None = Depends(idempotent_request),
 ):
     date_obj = date.fromisoformat(booking_date)
     start_obj = time.fromisoformat(start_time)
@@ -400,13 +927,14 @@ def admin_create_booking(
     min_time = time(7, 0)
     max_time = time(17, 0)
     if start_obj < min_time or end_obj > max_time or start_obj >= end_obj:
-        rooms = db.query(models.Room).all()
+        rooms, rooms_version = _cached_rooms(db)
         return templates.TemplateResponse(
             "admin_edit_booking.html",
             {
                 "request": request,
                 "booking": None,
                 "rooms": rooms,
+                "rooms_version": rooms_version,
                 "admin_user": current_admin,
                 "action": "/admin/bookings/new",
                 "title": "Nueva Reserva",
@@ -418,13 +946,14 @@ def admin_create_booking(
     room = db.query(models.Room).filter(models.Room.id == room_id).first()
 
     if room and attendees > (room.capacity or 9999):
-        rooms = db.query(models.Room).all()
+        rooms, rooms_version = _cached_rooms(db)
         return templates.TemplateResponse(
             "admin_edit_booking.html",
             {
                 "request": request,
                 "booking": None,
                 "rooms": rooms,
+                "rooms_version": rooms_version,
                 "admin_user": current_admin,
                 "action": "/admin/bookings/new",
                 "title": "Nueva Reserva",
@@ -444,13 +973,14 @@ def admin_create_booking(
         .first()
     )
     if existing:
-        rooms = db.query(models.Room).all()
+        rooms, rooms_version = _cached_rooms(db)
         return templates.TemplateResponse(
             "admin_edit_booking.html",
             {
                 "request": request,
                 "booking": None,
                 "rooms": rooms,
+                "rooms_version": rooms_version,
                 "admin_user": current_admin,
                 "action": "/admin/bookings/new",
                 "title": "Nueva Reserva",
@@ -463,9 +993,8 @@ def admin_create_booking(
     cancel_token_expires_at = datetime.utcnow() + timedelta(hours=48)
 
     new_booking = models.Booking(
-        user_name=user_name,
-        user_email=user_email,
-        area=area,
+        requester=_intern_requester(db, user_name, user_email),
+        area_ref=_intern_area(db, area),
         date=date_obj,
         start_time=start_obj,
         end_time=end_obj,
@@ -475,6 +1004,8 @@ def admin_create_booking(
         cancel_token_expires_at=cancel_token_expires_at,
     )
     db.add(new_booking)
+    write_legacy_booking_columns(db, new_booking)
+    _touch_rooms(db, room_id)
     db.commit()
 
     base_url = str(request.base_url).rstrip("/")
@@ -503,13 +1034,14 @@ def admin_edit_booking_form(
     booking = db.query(models.Booking).filter(models.Booking.id == booking_id).first()
     if not booking:
         raise HTTPException(status_code=404, detail="Reserva no encontrada.")
-    rooms = db.query(models.Room).all()
+    rooms, rooms_version = _cached_rooms(db)
     return templates.TemplateResponse(
         "admin_edit_booking.html",
         {
             "request": request,
             "booking": booking,
             "rooms": rooms,
+            "rooms_version": rooms_version,
             "admin_user": current_admin,
             "action": f"/admin/bookings/{booking_id}/edit",
             "title": "Editar Reserva",
@@ -532,6 +1064,7 @@ def admin_update_booking(
     attendees: int = Form(...),
     db: Session = Depends(get_db),
     current_admin: str = Depends(get_current_admin),
+    idempotency_claim: None = Depends(idempotent_request),
 ):
     booking = db.query(models.Booking).filter(models.Booking.id == booking_id).first()
     if not booking:
@@ -544,13 +1077,14 @@ def admin_update_booking(
     min_time = time(7, 0)
     max_time = time(17, 0)
     if start_obj < min_time or end_obj > max_time or start_obj >= end_obj:
-        rooms = db.query(models.Room).all()
+        rooms, rooms_version = _cached_rooms(db)
         return templates.TemplateResponse(
             "admin_edit_booking.html",
             {
                 "request": request,
                 "booking": booking,
                 "rooms": rooms,
+                "rooms_version": rooms_version,
                 "admin_user": current_admin,
                 "action": f"/admin/bookings/{booking_id}/edit",
                 "title": "Editar Reserva",
@@ -561,13 +1095,14 @@ def admin_update_booking(
 
     room = db.query(models.Room).filter(models.Room.id == room_id).first()
     if room and attendees > (room.capacity or 9999):
-        rooms = db.query(models.Room).all()
+        rooms, rooms_version = _cached_rooms(db)
         return templates.TemplateResponse(
             "admin_edit_booking.html",
             {
                 "request": request,
                 "booking": booking,
                 "rooms": rooms,
+                "rooms_version": rooms_version,
                 "admin_user": current_admin,
                 "action": f"/admin/bookings/{booking_id}/edit",
                 "title": "Editar Reserva",
@@ -589,13 +1124,14 @@ def admin_update_booking(
         .first()
     )
     if existing:
-        rooms = db.query(models.Room).all()
+        rooms, rooms_version = _cached_rooms(db)
         return templates.TemplateResponse(
             "admin_edit_booking.html",
             {
                 "request": request,
                 "booking": booking,
                 "rooms": rooms,
+                "rooms_version": rooms_version,
                 "admin_user": current_admin,
                 "action": f"/admin/bookings/{booking_id}/edit",
                 "title": "Editar Reserva",
@@ -604,14 +1140,15 @@ def admin_update_booking(
             status_code=400,
         )
 
-    booking.user_name = user_name
-    booking.user_email = user_email
-    booking.area = area
+    _touch_rooms(db, booking.room_id, room_id)
+    booking.requester = _intern_requester(db, user_name, user_email)
+    booking.area_ref = _intern_area(db, area)
     booking.date = date_obj
     booking.start_time = start_obj
     booking.end_time = end_obj
     booking.room_id = room_id
     booking.attendees = attendees
+    write_legacy_booking_columns(db, booking)
     db.commit()
 
     return RedirectResponse(url="/admin", status_code=302)
@@ -626,6 +1163,7 @@ def admin_delete_booking(
     booking = db.query(models.Booking).filter(models.Booking.id == booking_id).first()
     if not booking:
         raise HTTPException(status_code=404, detail="Reserva no encontrada.")
+    _touch_rooms(db, booking.room_id)
     db.delete(booking)
     db.commit()
     return RedirectResponse(url="/admin", status_code=302)
@@ -673,6 +1211,7 @@ def cancel_booking_confirm(token: str, request: Request, db: Session = Depends(g
             {"request": request, "success": False, "error": "El enlace de cancelación ha expirado."},
         )
 
+    _touch_rooms(db, booking.room_id)
     db.delete(booking)
     db.commit()
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, DateTime, Boolean, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .database.db import Base
 import datetime
@@ -11,16 +11,42 @@ class Room(Base):
     description = Column(String, nullable=True)
     color = Column(String)  # Para identificar visualmente en el calendario
     capacity = Column(Integer, default=10, nullable=True)  # Capacidad máxima de personas
+    # Se incrementa con cada escritura de reservas de la sala (invalida cachés)
+    bookings_version = Column(Integer, default=0, nullable=True)
+    bookings_updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=True)
 
     bookings = relationship("Booking", back_populates="room")
 
+class Area(Base):
+    """Área/departamento solicitante (tabla de dimensión, un registro por nombre)."""
+    __tablename__ = "areas"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+class Requester(Base):
+    """Responsable de la reserva: una fila por combinación nombre + correo."""
+    __tablename__ = "requesters"
+    __table_args__ = (UniqueConstraint("email", "name", name="uq_requesters_email_name"),)
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    email = Column(String, nullable=False)
+
+
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Ventanas de tiempo (recordatorios): fecha + hora de inicio
+        Index("ix_bookings_date_start_time", "date", "start_time"),
+        # Solapamiento por sala y feed .ics (sala + rango de fechas, ordenado)
+        Index("ix_bookings_room_date_start_time", "room_id", "date", "start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_name = Column(String, index=True)
-    user_email = Column(String, index=True)
-    area = Column(String)
+    requester_id = Column(Integer, ForeignKey("requesters.id"), index=True)
+    area_id = Column(Integer, ForeignKey("areas.id"), index=True)
     date = Column(Date, index=True)
     start_time = Column(Time)
     end_time = Column(Time)
@@ -31,6 +57,21 @@ class Booking(Base):
 
     room_id = Column(Integer, ForeignKey("rooms.id"))
     room = relationship("Room", back_populates="bookings")
+    requester = relationship("Requester", lazy="joined")
+    area_ref = relationship("Area", lazy="joined")
+
+    # Mantienen la forma de la API y de las plantillas (user_name, user_email, area)
+    @property
+    def user_name(self):
+        return self.requester.name if self.requester else None
+
+    @property
+    def user_email(self):
+        return self.requester.email if self.requester else None
+
+    @property
+    def area(self):
+        return self.area_ref.name if self.area_ref else None
 
 
 class AdminUser(Base):
@@ -41,3 +82,53 @@ class AdminUser(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class EmailJob(Base):
+    """Correo programado (recordatorio o resumen diario).
+
+    `key` identifica el envío de forma única (p. ej. reminder:12:2026-03-02T09:00)
+    para no enviarlo dos veces aunque la app se reinicie. Mientras se envía,
+    el trabajo queda arrendado a un proceso hasta `lease_expires_at`.
+    """
+    __tablename__ = "email_jobs"
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String, unique=True, nullable=False)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="sending")  # sending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class SchedulerLease(Base):
+    """Arriendo del scheduler interno: solo un worker lo ejecuta a la vez."""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class IdempotencyKey(Base):
+    """Respuesta guardada de un POST enviado con Idempotency-Key.
+
+    `key` es la ruta más la clave del cliente. Mientras la petición original
+    se procesa `status_code` es NULL; al terminar se guarda la respuesta y los
+    reintentos con la misma clave la reciben sin volver a ejecutar nada.
+    """
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String, unique=True, nullable=False)
+    fingerprint = Column(String, nullable=False)  # sha256 del cuerpo de la petición
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    location = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
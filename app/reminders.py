@@ -0,0 +1,307 @@
+"""
+Scheduler interno de correos programados.
+- Recordatorio REMINDER_MINUTES antes de cada reserva, agrupado por
+  destinatario (un solo correo si tiene varias reservas en la ventana).
+- Resumen diario por área a partir de DIGEST_TIME con las reservas del día,
+  enviado por separado a cada persona que reservó en el área.
+
+Solo un worker ejecuta el scheduler a la vez (tabla scheduler_leases). Cada
+envío queda registrado en email_jobs con una clave única, de modo que un
+reinicio no lo repite; si un proceso muere a mitad de envío, el arriendo del
+trabajo expira y otro lo reintenta. Los mensajes de cada ciclo se envían en
+peticiones batch de la Gmail API (máximo EMAIL_BATCH_SIZE por petición) con
+un único cliente reutilizado.
+
+Se activa con REMINDERS_ENABLED=true (además de MAIL_ENABLED=true).
+"""
+import os
+import socket
+import threading
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+from .database.db import SessionLocal
+from .mailer import _create_mime_message, _render_email_template, _str_to_bool, mail_enabled, mail_sender, send_batch
+
+REMINDER_MINUTES = int(os.getenv("REMINDER_MINUTES", "30"))
+DIGEST_TIME = time.fromisoformat(os.getenv("DIGEST_TIME", "06:30"))
+DIGEST_UNTIL = time(17, 0)  # No enviar el resumen del día después del cierre
+SCHEDULER_INTERVAL_SECONDS = int(os.getenv("SCHEDULER_INTERVAL_SECONDS", "60"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+JOB_LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+# Las reservas se guardan en hora local de Colombia (UTC-5, sin horario de verano)
+LOCAL_TZ = timezone(timedelta(hours=-5))
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+_LEASE_NAME = "email-scheduler"
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _local_now() -> datetime:
+    return datetime.now(LOCAL_TZ).replace(tzinfo=None)
+
+
+# ---------------------------------------------------------------------------
+# Arriendos
+# ---------------------------------------------------------------------------
+
+def _acquire_scheduler_lease(db: Session) -> bool:
+    now = datetime.utcnow()
+    expires = now + timedelta(seconds=SCHEDULER_INTERVAL_SECONDS * 3)
+    renewed = (
+        db.query(models.SchedulerLease)
+        .filter(
+            models.SchedulerLease.name == _LEASE_NAME,
+            or_(models.SchedulerLease.owner == _OWNER, models.SchedulerLease.expires_at < now),
+        )
+        .update({"owner": _OWNER, "expires_at": expires}, synchronize_session=False)
+    )
+    if renewed:
+        db.commit()
+        return True
+    try:
+        db.add(models.SchedulerLease(name=_LEASE_NAME, owner=_OWNER, expires_at=expires))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+
+def _claim_jobs(db: Session, keys: list[str], kind: str) -> set[str]:
+    """Arrienda los trabajos pendientes de `keys` y devuelve los obtenidos."""
+    if not keys:
+        return set()
+    now = datetime.utcnow()
+    lease = now + timedelta(seconds=JOB_LEASE_SECONDS)
+    existing = {job.key: job for job in db.query(models.EmailJob).filter(models.EmailJob.key.in_(keys))}
+
+    claimed = set()
+    for key in keys:
+        job = existing.get(key)
+        if job is None:
+            try:
+                with db.begin_nested():
+                    db.add(models.EmailJob(
+                        key=key, kind=kind, status="sending", attempts=1,
+                        lease_owner=_OWNER, lease_expires_at=lease,
+                    ))
+                claimed.add(key)
+            except IntegrityError:
+                pass
+            continue
+        if job.status == "sent" or job.attempts >= MAX_ATTEMPTS:
+            continue
+        taken = (
+            db.query(models.EmailJob)
+            .filter(
+                models.EmailJob.id == job.id,
+                models.EmailJob.status != "sent",
+                or_(models.EmailJob.lease_expires_at.is_(None), models.EmailJob.lease_expires_at < now),
+            )
+            .update(
+                {
+                    "status": "sending",
+                    "attempts": models.EmailJob.attempts + 1,
+                    "lease_owner": _OWNER,
+                    "lease_expires_at": lease,
+                },
+                synchronize_session=False,
+            )
+        )
+        if taken:
+            claimed.add(key)
+    db.commit()
+    return claimed
+
+
+def _finish_jobs(db: Session, keys: list[str], error: Optional[str]) -> None:
+    values = {"lease_owner": None, "lease_expires_at": None}
+    if error:
+        values.update(status="failed", last_error=error[:500])
+    else:
+        values.update(status="sent", sent_at=datetime.utcnow(), last_error=None)
+    db.query(models.EmailJob).filter(models.EmailJob.key.in_(keys)).update(values, synchronize_session=False)
+    db.commit()
+
+
+# ---------------------------------------------------------------------------
+# Selección de envíos
+# ---------------------------------------------------------------------------
+
+def _starts_between(start: datetime, end: datetime):
+    """Reservas que empiezan en (start, end]; usa ix_bookings_date_start_time."""
+    b = models.Booking
+    if start.date() == end.date():
+        return and_(b.date == start.date(), b.start_time > start.time(), b.start_time <= end.time())
+    return or_(
+        and_(b.date == start.date(), b.start_time > start.time()),
+        and_(b.date == end.date(), b.start_time <= end.time()),
+    )
+
+
+def _booking_context(booking: models.Booking) -> dict:
+    return {
+        "room_name": booking.room.name if booking.room else "Sala",
+        "booking_date": booking.date.isoformat(),
+        "start_time": booking.start_time.strftime("%H:%M"),
+        "end_time": booking.end_time.strftime("%H:%M"),
+        "user_name": booking.user_name,
+        "area": booking.area,
+        "attendees": booking.attendees,
+    }
+
+
+def _due_reminders(db: Session, now: datetime) -> list[tuple[list[str], str, str, str]]:
+    """Mensajes de recordatorio: (claves, destinatario, asunto, html)."""
+    horizon = now + timedelta(minutes=REMINDER_MINUTES)
+    bookings = (
+        db.query(models.Booking)
+        .options(joinedload(models.Booking.room))
+        .filter(_starts_between(now, horizon))
+        .order_by(models.Booking.date, models.Booking.start_time)
+        .all()
+    )
+    # Los datos se copian antes de _claim_jobs: su commit expira las reservas
+    # cargadas y cada acceso posterior volvería a consultarlas una a una.
+    # La hora va en la clave: si la reserva se mueve, se recuerda el nuevo horario
+    pending = {
+        f"reminder:{b.id}:{b.date.isoformat()}T{b.start_time:%H:%M}": (b.user_email, _booking_context(b))
+        for b in bookings
+        if b.user_email
+    }
+    claimed = _claim_jobs(db, list(pending), "reminder")
+
+    by_recipient = defaultdict(list)
+    for key, (email, context) in pending.items():
+        if key in claimed:
+            by_recipient[email].append((key, context))
+
+    messages = []
+    for email, items in by_recipient.items():
+        first = items[0][1]
+        context = {
+            "user_name": first["user_name"],
+            "minutes": REMINDER_MINUTES,
+            "bookings": [c for _, c in items],
+        }
+        subject = (
+            f"Recordatorio: {first['room_name']} a las {first['start_time']}"
+            if len(items) == 1
+            else f"Recordatorio: {len(items)} reservas próximas"
+        )
+        messages.append(([k for k, _ in items], email, subject, _render_email_template("email_reminder.html", context)))
+    return messages
+
+
+def _due_digests(db: Session, now: datetime) -> list[tuple[list[str], str, str, str]]:
+    """Resumen diario por área: un mensaje por persona que reservó hoy en el área.
+
+    Cada destinatario recibe su propio correo (y su propio trabajo en
+    email_jobs) para no exponer las direcciones del resto del área.
+    """
+    if not (DIGEST_TIME <= now.time() < DIGEST_UNTIL):
+        return []
+    today = now.date()
+    bookings = (
+        db.query(models.Booking)
+        .options(joinedload(models.Booking.room))
+        .filter(models.Booking.date == today)
+        .order_by(models.Booking.start_time)
+        .all()
+    )
+    by_area = defaultdict(list)
+    recipients = defaultdict(set)
+    for booking in bookings:
+        by_area[(booking.area_id, booking.area)].append(_booking_context(booking))
+        if booking.user_email:
+            recipients[(booking.area_id, booking.area)].add(booking.user_email)
+
+    pending = {
+        f"digest:{area_id}:{today.isoformat()}:{email}": (email, (area_id, area))
+        for (area_id, area), emails in recipients.items()
+        for email in sorted(emails)
+    }
+    claimed = _claim_jobs(db, list(pending), "digest")
+
+    rendered = {}
+    messages = []
+    for key, (email, area_key) in pending.items():
+        if key not in claimed:
+            continue
+        area, items = area_key[1], by_area[area_key]
+        if area_key not in rendered:
+            context = {"area": area, "date": today.isoformat(), "bookings": items}
+            rendered[area_key] = _render_email_template("email_digest.html", context)
+        subject = f"Reservas de hoy — {area} ({len(items)})"
+        messages.append(([key], email, subject, rendered[area_key]))
+    return messages
+
+
+# ---------------------------------------------------------------------------
+# Ciclo del scheduler
+# ---------------------------------------------------------------------------
+
+def _send(db: Session, messages: list[tuple[list[str], str, str, str]]) -> None:
+    sender = mail_sender()
+    for i in range(0, len(messages), EMAIL_BATCH_SIZE):
+        chunk = messages[i:i + EMAIL_BATCH_SIZE]
+        try:
+            errors = send_batch([_create_mime_message(sender, to, subject, html) for _, to, subject, html in chunk])
+        except Exception as e:
+            errors = [str(e)] * len(chunk)
+        for (keys, to, _, _), error in zip(chunk, errors):
+            _finish_jobs(db, keys, error)
+            if error:
+                print(f"[ERROR] No se pudo enviar el correo programado a {to}: {error}")
+        print(f"[INFO] Correos programados enviados: {errors.count(None)}/{len(chunk)}")
+
+
+def run_once(now: Optional[datetime] = None) -> None:
+    """Un ciclo del scheduler (si este proceso tiene el arriendo)."""
+    db = SessionLocal()
+    try:
+        if not _acquire_scheduler_lease(db):
+            return
+        now = now or _local_now()
+        messages = _due_reminders(db, now) + _due_digests(db, now)
+        if messages:
+            _send(db, messages)
+    finally:
+        db.close()
+
+
+def _loop() -> None:
+    while not _stop.wait(SCHEDULER_INTERVAL_SECONDS):
+        try:
+            run_once()
+        except Exception as e:
+            print(f"[ERROR] Falló el ciclo del scheduler de correos: {e}")
+
+
+def start_scheduler() -> None:
+    global _thread
+    if not (_str_to_bool(os.getenv("REMINDERS_ENABLED"), default=False) and mail_enabled()):
+        return
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="email-scheduler", daemon=True)
+    _thread.start()
+    print(f"[INFO] Scheduler de correos iniciado (cada {SCHEDULER_INTERVAL_SECONDS} s).")
+
+
+def stop_scheduler() -> None:
+    _stop.set()
+    if _thread:
+        _thread.join(timeout=10)
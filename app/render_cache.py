@@ -0,0 +1,115 @@
+"""
+Caché de renderizado de plantillas Jinja2.
+- fragment_cache: fragmentos (tarjetas de salas, opciones de sala, filas del
+  dashboard) indexados por (plantilla, versión de los datos, huella del
+  contexto).
+- page_cache: páginas completas (vista pública principal).
+
+Ambas son LRU en memoria por worker y llevan contadores de aciertos/fallos
+(/admin/api/cache-stats). La versión la decide quien llama; además la clave
+de un fragmento incluye la huella de su contexto, así que dos llamadas con la
+misma versión y distinto contexto no comparten entrada. Si los datos cambian,
+la clave cambia y la entrada vieja acaba saliendo por LRU.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, time
+from typing import Callable, Hashable
+
+from markupsafe import Markup
+from sqlalchemy import inspect
+from sqlalchemy.orm import DeclarativeMeta
+
+
+class RenderCache:
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> str:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = render()
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
+
+
+fragment_cache = RenderCache("fragments", int(os.getenv("FRAGMENT_CACHE_SIZE", "2000")))
+page_cache = RenderCache("pages", int(os.getenv("PAGE_CACHE_SIZE", "32")))
+
+
+def data_version(rows, *fields: str) -> tuple:
+    """Versión de una lista de objetos: los valores de los campos que se renderizan."""
+    return tuple(tuple(getattr(row, f) for f in fields) for row in rows)
+
+
+def _freeze(value):
+    """Forma estable (sin direcciones de memoria) de un valor del contexto."""
+    if value is None or isinstance(value, (str, int, float, bool, date, time)):
+        return value
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(repr(_freeze(v)) for v in value))
+    if isinstance(type(value), DeclarativeMeta):
+        # Fila ORM: sus columnas (las relaciones las cubre la versión)
+        return (type(value).__name__, tuple(
+            (attr.key, _freeze(getattr(value, attr.key))) for attr in inspect(value).mapper.column_attrs
+        ))
+    if hasattr(value, "model_dump"):
+        return (type(value).__name__, _freeze(value.model_dump()))
+    return repr(value)
+
+
+def context_key(context: dict) -> str:
+    return hashlib.sha1(repr(_freeze(context)).encode("utf-8")).hexdigest()
+
+
+def install(env) -> None:
+    """Registra `fragment(plantilla, versión, **contexto)` como global de Jinja2."""
+
+    def fragment(template_name: str, version: Hashable, **context) -> Markup:
+        html = fragment_cache.get_or_render(
+            (template_name, version, context_key(context)),
+            lambda: env.get_template(template_name).render(**context),
+        )
+        return Markup(html)
+
+    env.globals["fragment"] = fragment
+
+
+def stats() -> dict:
+    return {cache.name: cache.stats() for cache in (fragment_cache, page_cache)}
@@ -27,11 +27,36 @@ class BookingCreate(BookingBase):
     pass
 
 class Booking(BookingBase):
+    # Filas escritas por una versión anterior pueden no tener responsable/área
+    # hasta el siguiente relleno (app/database/migrations.py)
+    user_name: Optional[str] = None
+    user_email: Optional[str] = None
+    area: Optional[str] = None
     id: int
     created_at: datetime
     class Config:
         from_attributes = True
 
+class BookingCreated(Booking):
+    """Reserva recién creada, tal como la devuelve POST /api/bookings."""
+    cancel_token: Optional[str] = None
+    cancel_token_expires_at: Optional[datetime] = None
+
+
+class BookingWithRoom(Booking):
+    room: Room
+
+
+class BookingPage(BaseModel):
+    """Página de resultados de la búsqueda de reservas del panel admin."""
+    items: List[BookingWithRoom]
+    total: int
+    page: int
+    page_size: int
+    pages: int
+    room_counts: dict[int, int] = {}
+
+
 class BookingUpdate(BaseModel):
     """Schema para edición parcial de reservas por el administrador."""
     user_name: Optional[str] = None
@@ -42,3 +67,20 @@ class BookingUpdate(BaseModel):
     end_time: Optional[time] = None
     room_id: Optional[int] = None
     attendees: Optional[int] = None
+
+
+class AlternativeSlot(BaseModel):
+    """Franja libre cercana a la solicitada, para cuando ninguna sala está libre."""
+    room_id: int
+    room_name: str
+    start_time: time
+    end_time: time
+
+
+class RoomSearchResult(BaseModel):
+    date: date
+    start_time: time
+    end_time: time
+    attendees: int
+    available_rooms: List[Room]
+    alternatives: List[AlternativeSlot] = []
@@ -0,0 +1,158 @@
+"""
+Búsqueda de texto libre sobre reservas (responsable, correo y área).
+
+Semántica única en todos los motores: cada término se busca como subcadena,
+sin distinguir mayúsculas (`tabilidad` encuentra "Contabilidad"); los acentos
+sí cuentan.
+
+El texto vive en las tablas de dimensión `requesters` y `areas`, así que los
+índices se construyen sobre ellas (pocas filas, sin escrituras por reserva):
+- SQLite: tablas virtuales FTS5 (external content) con el tokenizador trigram,
+  sincronizadas con triggers.
+- PostgreSQL: índices GIN con pg_trgm para ILIKE '%texto%'.
+- Términos de menos de 3 caracteres (trigram no los indexa) o motor sin índice:
+  LIKE '%texto%' sin índice.
+"""
+import re
+
+from sqlalchemy import Integer, column, or_, select, text, union
+from sqlalchemy.orm import Query, Session
+
+from . import models
+
+# Se actualiza en ensure_search_index(); en SQLite indica si FTS5 está listo
+_fts_ready = False
+
+
+def _fts_ddl(table: str, columns: tuple[str, ...]) -> list[str]:
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    old_cols = ", ".join(f"old.{c}" for c in columns)
+    fts = f"{table}_fts"
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='id',
+            tokenize='trigram'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+        """,
+    ]
+
+
+_FTS_TABLES = {"requesters": ("name", "email"), "areas": ("name",)}
+
+# trigram no indexa términos más cortos
+_MIN_FTS_TERM = 3
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_requesters_name_trgm ON requesters USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_requesters_email_trgm ON requesters USING gin (email gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_areas_name_trgm ON areas USING gin (name gin_trgm_ops)",
+]
+
+
+def ensure_search_index(db: Session) -> None:
+    """Crea (si no existen) los índices de búsqueda del motor en uso."""
+    global _fts_ready
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        try:
+            for table, columns in _FTS_TABLES.items():
+                fts = f"{table}_fts"
+                existing = db.execute(
+                    text("SELECT sql FROM sqlite_master WHERE name = :name"), {"name": fts}
+                ).scalar()
+                if existing is not None and "trigram" not in existing:
+                    # Índice de una versión anterior (búsqueda por prefijo): se recrea
+                    for suffix in ("ai", "ad", "au"):
+                        db.execute(text(f"DROP TRIGGER IF EXISTS {fts}_{suffix}"))
+                    db.execute(text(f"DROP TABLE {fts}"))
+                    existing = None
+                for sql in _fts_ddl(table, columns):
+                    db.execute(text(sql))
+                if existing is None:
+                    # Indexar las filas que ya existían antes de crear la tabla
+                    db.execute(text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+            db.commit()
+            _fts_ready = True
+        except Exception as e:
+            db.rollback()
+            _fts_ready = False
+            print(f"[WARN] FTS5 no disponible, la búsqueda usará LIKE: {e}")
+
+    elif dialect == "postgresql":
+        for sql in _POSTGRES_DDL:
+            try:
+                db.execute(text(sql))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"[WARN] No se pudo crear índice de búsqueda ({sql}): {e}")
+
+
+def _terms(q: str) -> list[str]:
+    return [t for t in q.split() if t]
+
+
+def _fts5_phrase(term: str) -> str:
+    # Con trigram, una frase entre comillas coincide como subcadena: "tabilidad"
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term: str) -> str:
+    return "%" + re.sub(r"([\\%_])", r"\\\1", term) + "%"
+
+
+def _fts_ids(table: str, term: str):
+    return text(f"SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH :fts").bindparams(
+        fts=_fts5_phrase(term)
+    ).columns(column("rowid", Integer))
+
+
+def apply_text_search(query: Query, db: Session, q: str) -> Query:
+    """Filtra `query` (sobre models.Booking) por los términos de `q`.
+
+    Todos los términos deben aparecer (como subcadena) en el nombre o correo
+    del responsable o en el área de la reserva.
+    """
+    use_fts = db.get_bind().dialect.name == "sqlite" and _fts_ready
+
+    for term in _terms(q):
+        if use_fts and len(term) >= _MIN_FTS_TERM:
+            requester_ids = _fts_ids("requesters", term)
+            area_ids = _fts_ids("areas", term)
+        else:
+            pattern = _like_pattern(term)
+            requester_ids = select(models.Requester.id).where(
+                or_(
+                    models.Requester.name.ilike(pattern, escape="\\"),
+                    models.Requester.email.ilike(pattern, escape="\\"),
+                )
+            )
+            area_ids = select(models.Area.id).where(models.Area.name.ilike(pattern, escape="\\"))
+        # UNION en lugar de OR: cada rama usa su índice (ix_bookings_requester_id /
+        # ix_bookings_area_id); con OR, SQLite recorre bookings completa.
+        matching = union(
+            select(models.Booking.id).where(models.Booking.requester_id.in_(requester_ids)),
+            select(models.Booking.id).where(models.Booking.area_id.in_(area_ids)),
+        )
+        query = query.filter(models.Booking.id.in_(matching))
+    return query
@@ -1,16 +1,101 @@
-document.addEventListener('DOMContentLoaded', async function() {
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register('/sw.js').catch(error => {
+        console.warn('No se pudo registrar el service worker:', error);
+    });
+}
+
+// Copia local de las respuestas de /api (IndexedDB), indexada por URL.
+// Si el navegador no tiene IndexedDB (o está bloqueado) todo va a la red.
+const localStore = (() => {
+    const STORE = 'responses';
+    let dbPromise = null;
+
+    function open() {
+        if (!dbPromise) {
+            dbPromise = new Promise(resolve => {
+                if (!window.indexedDB) {
+                    resolve(null);
+                    return;
+                }
+                const request = indexedDB.open('chvs-salas', 1);
+                request.onupgradeneeded = () => request.result.createObjectStore(STORE);
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => resolve(null);
+            });
+        }
+        return dbPromise;
+    }
+
+    async function run(mode, action) {
+        const db = await open();
+        if (!db) {
+            return undefined;
+        }
+        return new Promise(resolve => {
+            const request = action(db.transaction(STORE, mode).objectStore(STORE));
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(undefined);
+        });
+    }
+
+    return {
+        get: url => run('readonly', store => store.get(url)),
+        put: (url, value) => run('readwrite', store => store.put(value, url))
+    };
+})();
+
+// URLs ya revalidadas en esta visita (se vacía tras crear una reserva)
+const revalidated = new Set();
+
+// Pide `url` a la red con If-None-Match; guarda la respuesta si cambió.
+async function revalidate(url, cached) {
+    const headers = cached && cached.etag ? { 'If-None-Match': cached.etag } : {};
+    const response = await fetch(url, { headers, cache: 'no-store' });
+    revalidated.add(url);
+    if (response.status === 304) {
+        return { changed: false, data: cached.data };
+    }
+    if (!response.ok) {
+        throw new Error(`${url}: HTTP ${response.status}`);
+    }
+    const data = await response.json();
+    await localStore.put(url, { etag: response.headers.get('ETag'), data });
+    return { changed: true, data };
+}
+
+// Devuelve la copia local al instante (y revalida en segundo plano, llamando
+// a onChange si había cambios) o, si no hay copia, espera a la red.
+async function loadCached(url, onChange) {
+    const cached = await localStore.get(url);
+    if (!cached) {
+        return (await revalidate(url, null)).data;
+    }
+    if (!revalidated.has(url)) {
+        revalidate(url, cached)
+            .then(result => { if (result.changed) onChange(); })
+            .catch(error => console.warn('Sin conexión, usando datos locales:', error));
+    }
+    return cached.data;
+}
+
+document.addEventListener('DOMContentLoaded', function() {
     const calendarEl = document.getElementById('calendar');
     const bookingForm = document.getElementById('bookingForm');
     const bookingModal = new bootstrap.Modal(document.getElementById('bookingModal'));
-    
-    // Fetch bookings and rooms
-    async function fetchBookings() {
-        const response = await fetch('/api/bookings');
-        const bookings = await response.json();
-        
-        // Fetch rooms to get colors
-        const roomsResponse = await fetch('/api/rooms');
-        const rooms = await roomsResponse.json();
+    let calendar;
+
+    const refreshCalendar = () => calendar.refetchEvents();
+
+    // Reservas del rango visible (la semana/mes que muestra el calendario)
+    async function fetchBookings(info) {
+        const params = new URLSearchParams({
+            start: info.startStr.substring(0, 10),
+            end: info.endStr.substring(0, 10)
+        });
+        const [bookings, rooms] = await Promise.all([
+            loadCached(`/api/bookings?${params}`, refreshCalendar),
+            loadCached('/api/rooms', refreshCalendar)
+        ]);
         const roomMap = rooms.reduce((acc, room) => {
             acc[room.id] = { name: room.name, color: room.color };
             return acc;
@@ -18,7 +103,7 @@ document.addEventListener('DOMContentLoaded', async function() {
 
         return bookings.map(b => ({
             id: b.id,
-            title: `${b.user_name} (${b.area}) - ${roomMap[b.room_id].name}`,
+            title: `${b.user_name ?? 'Reserva'} (${b.area ?? '—'}) - ${roomMap[b.room_id].name}`,
             start: `${b.date}T${b.start_time}`,
             end: `${b.date}T${b.end_time}`,
             backgroundColor: roomMap[b.room_id].color,
@@ -33,9 +118,7 @@ document.addEventListener('DOMContentLoaded', async function() {
         }));
     }
 
-    const initialEvents = await fetchBookings();
-
-    const calendar = new FullCalendar.Calendar(calendarEl, {
+    calendar = new FullCalendar.Calendar(calendarEl, {
         initialView: window.innerWidth < 768 ? 'timeGridDay' : 'timeGridWeek',
         headerToolbar: {
             left: 'prev,next today',
@@ -45,7 +128,9 @@ document.addEventListener('DOMContentLoaded', async function() {
         locale: 'es',
         slotMinTime: '07:00:00',
         slotMaxTime: '17:00:00',
-        events: initialEvents,
+        events: function(info, successCallback, failureCallback) {
+            fetchBookings(info).then(successCallback).catch(failureCallback);
+        },
         allDaySlot: false,
         expandRows: true,
         height: 'auto',
@@ -69,6 +154,7 @@ document.addEventListener('DOMContentLoaded', async function() {
             if (info.dateStr.includes('T')) {
                 document.getElementById('start_time').value = info.dateStr.split('T')[1].substring(0, 5);
             }
+            // show.bs.modal consulta la disponibilidad del horario recién elegido
             bookingModal.show();
         },
         windowResize: function(view) {
@@ -82,30 +168,139 @@ document.addEventListener('DOMContentLoaded', async function() {
 
     calendar.render();
 
+    // Disponibilidad de salas para la fecha/horario del formulario
+    const roomSelect = document.getElementById('room_id');
+    const availabilityHint = document.getElementById('availability_hint');
+    const availabilityFields = ['booking_date', 'start_time', 'end_time', 'attendees'];
+
+    let noRoomAvailable = false;
+    // Solo se aplica la respuesta de la última búsqueda (las lentas llegan tarde)
+    let availabilityRequest = 0;
+
+    function resetRoomAvailability() {
+        availabilityRequest++;
+        for (const option of roomSelect.options) {
+            option.disabled = false;
+        }
+        noRoomAvailable = false;
+        availabilityHint.textContent = '';
+    }
+
+    async function updateRoomAvailability() {
+        const requestId = ++availabilityRequest;
+        const params = new URLSearchParams({
+            date: document.getElementById('booking_date').value,
+            start: document.getElementById('start_time').value,
+            end: document.getElementById('end_time').value,
+            attendees: document.getElementById('attendees').value || '1'
+        });
+        if (!params.get('date') || !params.get('start') || !params.get('end')) {
+            resetRoomAvailability();
+            return;
+        }
+
+        const response = await fetch(`/api/rooms/search?${params}`);
+        if (requestId !== availabilityRequest) {
+            return;
+        }
+        if (!response.ok) {
+            resetRoomAvailability();
+            return;
+        }
+        const result = await response.json();
+        if (requestId !== availabilityRequest) {
+            return;
+        }
+        const freeIds = new Set(result.available_rooms.map(r => String(r.id)));
+
+        if (freeIds.size && !freeIds.has(roomSelect.value)) {
+            roomSelect.value = result.available_rooms[0].id;
+            roomSelect.dispatchEvent(new Event('change'));
+        }
+        // La opción elegida nunca se deshabilita: FormData omitiría room_id
+        for (const option of roomSelect.options) {
+            option.disabled = !freeIds.has(option.value) && option.value !== roomSelect.value;
+        }
+        noRoomAvailable = freeIds.size === 0;
+
+        if (freeIds.size) {
+            availabilityHint.style.color = '#62B33E';
+            availabilityHint.textContent = `${freeIds.size} sala(s) disponible(s) en este horario`;
+        } else if (result.alternatives.length) {
+            const slots = result.alternatives
+                .map(a => `${a.room_name} ${a.start_time.substring(0, 5)}-${a.end_time.substring(0, 5)}`)
+                .join(', ');
+            availabilityHint.style.color = '#dc3545';
+            availabilityHint.textContent = `Sin salas libres. Alternativas: ${slots}`;
+        } else {
+            availabilityHint.style.color = '#dc3545';
+            availabilityHint.textContent = 'Sin salas libres ese día para este grupo.';
+        }
+    }
+
+    availabilityFields.forEach(id => {
+        document.getElementById(id).addEventListener('change', updateRoomAvailability);
+    });
+
+    // dateClick rellena fecha/hora con .value (no dispara 'change'): se consulta
+    // al abrir el modal y se limpia al cerrarlo para no arrastrar otro horario.
+    const bookingModalEl = document.getElementById('bookingModal');
+    bookingModalEl.addEventListener('show.bs.modal', updateRoomAvailability);
+    bookingModalEl.addEventListener('hidden.bs.modal', resetRoomAvailability);
+
+    // Clave de idempotencia: la misma mientras se reintenta un envío (doble
+    // clic, red inestable); se renueva cuando el servidor responde.
+    function newIdempotencyKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        const bytes = crypto.getRandomValues(new Uint8Array(16));
+        return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    let idempotencyKey = newIdempotencyKey();
+
+    // FastAPI devuelve `detail` como texto o como lista de errores de validación
+    function errorMessage(detail) {
+        if (Array.isArray(detail)) {
+            return detail.map(d => d.msg).join('\n');
+        }
+        return detail;
+    }
+
     // Handle form submission
     bookingForm.addEventListener('submit', async function(e) {
         e.preventDefault();
+
+        if (noRoomAvailable) {
+            alert(availabilityHint.textContent);
+            return;
+        }
         
         const formData = new FormData(bookingForm);
         
         try {
             const response = await fetch('/api/bookings', {
                 method: 'POST',
+                headers: { 'Idempotency-Key': idempotencyKey },
                 body: formData
             });
 
             const result = await response.json();
+            if (response.status !== 409) {
+                idempotencyKey = newIdempotencyKey();
+            }
 
             if (response.ok) {
                 alert('¡Reserva confirmada con éxito!');
                 bookingModal.hide();
                 bookingForm.reset();
+                resetRoomAvailability();
                 // Refresh events
-                const updatedEvents = await fetchBookings();
-                calendar.removeAllEvents();
-                calendar.addEventSource(updatedEvents);
+                revalidated.clear();
+                calendar.refetchEvents();
             } else {
-                alert('Error: ' + result.detail);
+                alert('Error: ' + errorMessage(result.detail));
             }
         } catch (error) {
             console.error('Error submitting booking:', error);
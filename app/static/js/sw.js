@@ -0,0 +1,84 @@
+// Service worker del calendario público.
+// Guarda la página principal, los estáticos y las librerías de CDN para que el
+// calendario se pinte sin esperar a la red (las reservas van en IndexedDB, ver
+// calendar.js). Estrategia stale-while-revalidate: responde con la copia local
+// y la actualiza en segundo plano para la próxima visita.
+const CACHE_NAME = 'chvs-shell-v1';
+
+const SHELL = [
+    '/',
+    '/static/css/style.css',
+    '/static/js/calendar.js',
+    '/static/img/bg_sala_juntas.jpg'
+];
+
+const CDN_ASSETS = [
+    'https://unpkg.com/lucide@latest',
+    'https://cdn.jsdelivr.net/npm/fullcalendar@6.1.10/index.global.min.js',
+    'https://cdn.jsdelivr.net/npm/@fullcalendar/core@6.1.10/locales-all.global.min.js',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js'
+];
+
+const CDN_ORIGINS = [
+    'https://unpkg.com',
+    'https://cdn.jsdelivr.net',
+    'https://fonts.googleapis.com',
+    'https://fonts.gstatic.com'
+];
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(CACHE_NAME);
+        await cache.addAll(SHELL);
+        // Las librerías de CDN se cargan con <script>/<link> sin CORS: respuestas opacas
+        await Promise.allSettled(CDN_ASSETS.map(async url => {
+            const response = await fetch(url, { mode: 'no-cors' });
+            await cache.put(url, response);
+        }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names.filter(name => name !== CACHE_NAME).map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+function isCacheable(url) {
+    if (url.origin === self.location.origin) {
+        return url.pathname === '/' || url.pathname.startsWith('/static/');
+    }
+    return CDN_ORIGINS.includes(url.origin);
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+    const url = new URL(request.url);
+    // API, admin y feeds .ics siempre van a la red
+    if (!isCacheable(url)) {
+        return;
+    }
+
+    event.respondWith((async () => {
+        const cache = await caches.open(CACHE_NAME);
+        const cached = await cache.match(request, { ignoreSearch: url.pathname === '/' });
+        const network = fetch(request).then(async response => {
+            if (response.ok || response.type === 'opaque') {
+                await cache.put(request, response.clone());
+            }
+            return response;
+        });
+        if (cached) {
+            event.waitUntil(network.catch(() => {}));
+            return cached;
+        }
+        return network;
+    })());
+});
@@ -0,0 +1,113 @@
+"""
+Benchmark de throughput según el número de workers del perfil de producción.
+Ejecutar desde la raíz del proyecto:
+    python bench_server.py [workers ...] [--seconds N] [--clients N] [--path /api/rooms]
+
+Ejemplo:
+    python bench_server.py 1 2 4 --seconds 10
+
+Por cada número de workers levanta `gunicorn -c gunicorn.conf.py` sobre una
+base SQLite temporal, espera a /readyz y mide peticiones por segundo con
+clientes HTTP keep-alive en procesos separados.
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+HOST = "127.0.0.1"
+
+
+def wait_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=1)
+            conn.request("GET", "/readyz")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servidor en el puerto {port} no estuvo listo a tiempo")
+
+
+def client_loop(port: int, path: str, seconds: float) -> tuple[int, int]:
+    ok = errors = 0
+    conn = http.client.HTTPConnection(HOST, port, timeout=10)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status == 200:
+                ok += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(HOST, port, timeout=10)
+    conn.close()
+    return ok, errors
+
+
+def run(workers: int, port: int, args) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            WEB_CONCURRENCY=str(workers),
+            DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+            MAIL_ENABLED="false",
+            LOG_LEVEL="warning",
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null"],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(port)
+            with ProcessPoolExecutor(max_workers=args.clients) as pool:
+                futures = [pool.submit(client_loop, port, args.path, args.seconds) for _ in range(args.clients)]
+                results = [f.result() for f in futures]
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+    ok = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    rps = ok / args.seconds
+    print(f"  workers={workers:<3} {rps:8.1f} req/s   ({ok} ok, {errors} errores)")
+    return rps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("workers", nargs="*", type=int, default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--path", default="/api/rooms")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"GET {args.path} — {args.clients} clientes, {args.seconds:.0f} s por configuración")
+    baseline = None
+    for workers in args.workers:
+        rps = run(workers, args.port, args)
+        baseline = baseline or rps
+    if baseline and len(args.workers) > 1:
+        print(f"Escalado {args.workers[0]} → {args.workers[-1]} workers: {rps / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark del tiempo de arranque de la aplicación.
+Ejecutar desde la raíz del proyecto:
+    python bench_startup.py [repeticiones]
+
+Mide, en procesos nuevos, cuánto tarda `import app.main` y verifica que los
+clientes de Google no se carguen al importar (se importan con el primer correo).
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+LAZY_MODULES = ["googleapiclient.discovery", "google.oauth2.credentials", "email.mime.multipart"]
+
+PROBE = f"""
+import sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+loaded = [m for m in {LAZY_MODULES!r} if m in sys.modules]
+print(f"{{elapsed:.4f}}|{{','.join(loaded)}}")
+"""
+
+
+def run_once(env: dict) -> tuple[float, list[str]]:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip().splitlines()[-1]
+    elapsed, loaded = out.split("|")
+    return float(elapsed), [m for m in loaded.split(",") if m]
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", MAIL_ENABLED="false")
+        samples = []
+        loaded = []
+        for _ in range(repeats):
+            elapsed, loaded = run_once(env)
+            samples.append(elapsed)
+
+    print(f"import app.main ({repeats} procesos)")
+    print(f"  mediana: {statistics.median(samples) * 1000:.1f} ms")
+    print(f"  mínimo : {min(samples) * 1000:.1f} ms")
+    print(f"  máximo : {max(samples) * 1000:.1f} ms")
+
+    if loaded:
+        print(f"❌ Módulos pesados cargados al importar: {loaded}")
+        sys.exit(1)
+    print("✅ Los clientes de Google no se cargan al importar la app.")
+
+
+if __name__ == "__main__":
+    main()
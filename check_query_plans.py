@@ -0,0 +1,377 @@
+"""
+Guarda de planes de consulta para las consultas calientes de reservas.
+Ejecutar desde la raíz del proyecto:
+    python check_query_plans.py [--bookings N] [--database-url URL]
+
+Crea una base de datos con volumen realista (SQLite temporal por defecto; con
+--database-url, una PostgreSQL VACÍA dedicada a esta prueba), ejecuta las
+rutas calientes de la app tal como están en el código, captura cada SELECT
+sobre `bookings` y obtiene su plan (EXPLAIN QUERY PLAN en SQLite, EXPLAIN
+(FORMAT JSON) en PostgreSQL).
+
+Termina con código 1 si alguna consulta:
+- recorre la tabla bookings completa (SCAN sin índice / Seq Scan),
+- ordena todas las filas sin índice cuando se espera un recorrido ordenado,
+- o estima leer de bookings más filas que su presupuesto.
+
+En SQLite la estimación sale de sqlite_stat1 (tras ANALYZE), igual que la del
+planificador: filas por clave del prefijo de igualdades del índice, /4 por cada
+condición de rango. En PostgreSQL es el "Plan Rows" de los nodos sobre bookings.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+sys.path.insert(0, str(ROOT))
+
+SEED = 37
+REQUESTERS = 600
+AREAS = 25
+
+
+class HotQuery:
+    def __init__(self, name: str, run, max_rows: int, ordered: bool = False, index_scan_ok: bool = False):
+        self.name = name
+        self.run = run
+        self.max_rows = max_rows
+        # Debe devolver las filas en orden sin ordenar toda la tabla
+        self.ordered = ordered
+        # Recorrido completo de un índice permitido (ORDER BY ... LIMIT)
+        self.index_scan_ok = index_scan_ok
+
+
+# ---------------------------------------------------------------------------
+# Datos
+# ---------------------------------------------------------------------------
+
+def seed(db, models, total: int) -> None:
+    """Responsables, áreas y `total` reservas sin solapamientos alrededor de hoy."""
+    from sqlalchemy import insert
+
+    rng = random.Random(SEED)
+    db.execute(insert(models.Area), [{"name": f"ÁREA {i:02d}"} for i in range(AREAS)])
+    db.execute(
+        insert(models.Requester),
+        [{"name": f"Responsable {i}", "email": f"responsable{i}@chvs.org"} for i in range(REQUESTERS)],
+    )
+    room_ids = [r.id for r in db.query(models.Room).order_by(models.Room.id)]
+
+    per_day = len(room_ids) * 6  # ~6 reservas por sala y día laboral
+    days = max(total // per_day, 1) + 1
+    first_day = date.today() - timedelta(days=days // 2)
+    rows = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for room_id in room_ids:
+            for hour in sorted(rng.sample(range(7, 17), rng.randint(3, 9))):
+                rows.append({
+                    "room_id": room_id,
+                    "requester_id": rng.randint(1, REQUESTERS),
+                    "area_id": rng.randint(1, AREAS),
+                    "date": day,
+                    "start_time": time(hour, 0),
+                    "end_time": time(hour, 50),
+                    "attendees": rng.randint(1, 8),
+                    "cancel_token": secrets.token_urlsafe(24),
+                    "cancel_token_expires_at": datetime.utcnow() + timedelta(hours=48),
+                    "created_at": datetime.utcnow(),
+                })
+    rows = rows[:total]
+    for i in range(0, len(rows), 5000):
+        db.execute(insert(models.Booking), rows[i:i + 5000])
+    db.commit()
+    print(f"[INFO] {len(rows)} reservas en {len(room_ids)} salas, del {rows[0]['date']} al {rows[-1]['date']}.")
+
+
+# ---------------------------------------------------------------------------
+# Consultas calientes (se ejecuta el código real de la app)
+# ---------------------------------------------------------------------------
+
+def hot_queries(main, models, reminders, calendar_feed, fake_request, db):
+    from fastapi import BackgroundTasks, Response
+
+    today = date.today()
+    day = today + timedelta(days=3)
+    # Datos de partida (se leen antes de empezar a capturar)
+    existing = db.query(models.Booking).filter(models.Booking.date == day).order_by(models.Booking.id).first()
+    existing_id, existing_room, existing_token = existing.id, existing.room_id, existing.cancel_token
+    existing_start, existing_end = existing.start_time.strftime("%H:%M"), existing.end_time.strftime("%H:%M")
+    first_room_id = db.query(models.Room.id).order_by(models.Room.id).limit(1).scalar()
+
+    def overlap_create(db):
+        # 16:50-17:00 nunca está ocupado por el seed: recorre el camino completo
+        asyncio.run(main.create_booking(
+            request=fake_request(), background_tasks=BackgroundTasks(),
+            user_name="Guarda", user_email="guarda@chvs.org", area="ÁREA 00",
+            booking_date=day.isoformat(), start_time="16:50", end_time="17:00",
+            room_id=first_room_id, attendees=1, db=db,
+        ))
+
+    def overlap_update(db):
+        main.admin_update_booking(
+            booking_id=existing_id, request=fake_request(),
+            user_name="Guarda", user_email="guarda@chvs.org", area="ÁREA 00",
+            booking_date=day.isoformat(), start_time=existing_start, end_time=existing_end,
+            room_id=existing_room, attendees=1, db=db, current_admin="guarda",
+        )
+
+    def cancel_lookup(db):
+        main.cancel_booking_form(token=existing_token, request=fake_request(), db=db)
+
+    def room_search(db):
+        main.search_rooms(booking_date=day.isoformat(), start="09:00", end="10:00", attendees=4, db=db)
+
+    def dashboard_first_page(db):
+        main._search_bookings(db)
+
+    def dashboard_range(db):
+        main._search_bookings(db, desde=(today - timedelta(days=7)).isoformat(), hasta=today.isoformat())
+
+    def dashboard_text(db):
+        main._search_bookings(db, q="responsable17")
+
+    def calendar_range(db):
+        monday = today - timedelta(days=today.weekday())
+        main.get_bookings(
+            request=fake_request(), response=Response(), db=db,
+            start=monday, end=monday + timedelta(days=7),
+        )
+
+    def ics_feed(db):
+        room = db.get(models.Room, first_room_id)
+        calendar_feed._build(db, room, today - timedelta(days=calendar_feed.FEED_DAYS_BACK))
+
+    def reminder_window(db):
+        reminders._due_reminders(db, datetime.combine(today, time(8, 55)))
+
+    def digest_day(db):
+        reminders._due_digests(db, datetime.combine(today, reminders.DIGEST_TIME))
+
+    # Presupuestos calibrados para el volumen por defecto (--bookings 20000).
+    # Los rangos de fechas se estiman como 1/16 de la tabla (heurística de SQLite).
+    return [
+        HotQuery("Solapamiento al crear (POST /api/bookings)", overlap_create, max_rows=2),
+        HotQuery("Solapamiento al editar (admin)", overlap_update, max_rows=2),
+        HotQuery("Token de cancelación", cancel_lookup, max_rows=1),
+        HotQuery("Salas libres del día (/api/rooms/search)", room_search, max_rows=50),
+        HotQuery("Dashboard sin filtros: primera página", dashboard_first_page, max_rows=100,
+                 ordered=True, index_scan_ok=True),
+        HotQuery("Dashboard: última semana", dashboard_range, max_rows=2500, ordered=True),
+        HotQuery("Dashboard: búsqueda de texto", dashboard_text, max_rows=1500),
+        HotQuery("Calendario: semana visible (/api/bookings)", calendar_range, max_rows=2500),
+        HotQuery("Feed .ics de una sala", ics_feed, max_rows=1000, ordered=True),
+        HotQuery("Recordatorios: ventana de inicio", reminder_window, max_rows=50),
+        HotQuery("Resumen diario: reservas de hoy", digest_day, max_rows=50),
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Planes
+# ---------------------------------------------------------------------------
+
+_SQLITE_ACCESS = re.compile(r"^(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?(?: \((.*)\))?")
+
+
+def sqlite_stats(conn) -> dict:
+    stats = {}
+    for tbl, idx, stat in conn.exec_driver_sql("SELECT tbl, idx, stat FROM sqlite_stat1").all():
+        if tbl == "bookings":
+            stats[idx or tbl] = [int(n) for n in stat.split()[:10] if n.isdigit()]
+    return stats
+
+
+def explain_sqlite(conn, statement, parameters, stats) -> list[dict]:
+    """Accesos a bookings del plan: detalle, estimación de filas y tipo de recorrido."""
+    total = stats.get("bookings", [0])[0] or max(v[0] for v in stats.values())
+    accesses = []
+    for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all():
+        detail = row[-1]
+        if "TEMP B-TREE FOR ORDER BY" in detail and "RIGHT PART" not in detail:
+            accesses.append({"detail": detail, "rows": 0, "full_sort": True})
+            continue
+        match = _SQLITE_ACCESS.match(detail)
+        if not match or match.group(2) != "bookings":
+            continue
+        kind, _, index, constraints = match.groups()
+        if "INTEGER PRIMARY KEY" in detail:
+            rows = 1
+        elif kind == "SCAN":
+            rows = total
+        else:
+            constraints = constraints or ""
+            equalities = len(re.findall(r"\w+=\?", constraints))
+            ranges = len(re.findall(r"\w+[<>]=?\?", constraints))
+            index_stats = stats.get(index, [total])
+            rows = index_stats[min(equalities, len(index_stats) - 1)] if equalities else total
+            rows = max(rows // (4 ** ranges), 1)
+        accesses.append({
+            "detail": detail,
+            "rows": rows,
+            "table_scan": kind == "SCAN" and index is None,
+            "index_scan": kind == "SCAN" and index is not None,
+        })
+    return accesses
+
+
+def _walk_pg(node: dict, cap: float, accesses: list[dict]) -> None:
+    if node.get("Node Type") == "Limit":
+        cap = min(cap, node.get("Plan Rows", cap))
+    if node.get("Relation Name") == "bookings":
+        node_type = node["Node Type"]
+        accesses.append({
+            "detail": f"{node_type} on bookings" + (f" using {node['Index Name']}" if node.get("Index Name") else ""),
+            "rows": int(min(node.get("Plan Rows", 0), cap)),
+            "table_scan": node_type == "Seq Scan",
+            "index_scan": False,
+        })
+    if node.get("Node Type") == "Sort" and cap >= node.get("Plan Rows", 0):
+        # Un Sort sin Limit por encima ordena todas las filas que recibe
+        accesses.append({"detail": "Sort", "rows": 0, "sort_rows": node.get("Plan Rows", 0)})
+    for child in node.get("Plans", []):
+        _walk_pg(child, cap, accesses)
+
+
+def explain_postgres(conn, statement, parameters) -> list[dict]:
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    accesses = []
+    _walk_pg(plan[0]["Plan"], float("inf"), accesses)
+    return accesses
+
+
+def check(query: HotQuery, accesses: list[dict]) -> list[str]:
+    problems = []
+    estimated = 0
+    for access in accesses:
+        if access.get("table_scan"):
+            problems.append(f"recorrido completo de bookings: {access['detail']}")
+        elif access.get("index_scan") and not query.index_scan_ok:
+            problems.append(f"recorrido completo de índice: {access['detail']}")
+        elif access.get("index_scan"):
+            continue  # ORDER BY ... LIMIT: se detiene al llenar la página
+        if query.ordered and (access.get("full_sort") or access.get("sort_rows", 0) > query.max_rows):
+            problems.append(f"ordena sin índice: {access['detail']}")
+        estimated += access.get("rows", 0)
+    if estimated > query.max_rows:
+        problems.append(f"estimación de {estimated} filas de bookings (presupuesto {query.max_rows})")
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Principal
+# ---------------------------------------------------------------------------
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=20000, help="reservas a sembrar (20000 por defecto)")
+    parser.add_argument("--database-url", help="PostgreSQL vacía para la prueba (por defecto SQLite temporal)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostrar el plan de cada consulta")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmpdir.name}/plans.db"
+    os.environ.pop("DATABASE_REPLICA_URL", None)
+    os.environ["MAIL_ENABLED"] = "false"
+    os.environ["REMINDERS_ENABLED"] = "false"
+
+    from sqlalchemy import event, text
+    from starlette.requests import Request
+
+    import app.main as app_main
+    from app import calendar_feed, models, reminders
+    from app.database.db import SessionLocal, engine
+
+    dialect = engine.dialect.name
+    app_main.startup_db_seed()
+    db = SessionLocal()
+    try:
+        if db.query(models.Booking).count():
+            print("[ERROR] La base de datos ya tiene reservas; use una base vacía dedicada a la prueba.")
+            return 2
+        seed(db, models, args.bookings)
+        db.execute(text("ANALYZE"))
+        db.commit()
+    finally:
+        db.close()
+
+    def fake_request():
+        return Request({
+            "type": "http", "method": "GET", "scheme": "http", "server": ("localhost", 8000),
+            "path": "/", "root_path": "", "headers": [], "query_string": b"",
+        })
+
+    captured = []
+    recording = False
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if recording and not executemany and statement.lstrip().upper().startswith("SELECT") and "bookings" in statement:
+            captured.append((statement, parameters))
+
+    with engine.connect() as conn:
+        stats = sqlite_stats(conn) if dialect == "sqlite" else None
+
+    db = SessionLocal()
+    try:
+        queries = hot_queries(app_main, models, reminders, calendar_feed, fake_request, db)
+    finally:
+        db.close()
+
+    failures = 0
+    print(f"[INFO] Motor: {dialect}\n")
+    for query in queries:
+        captured.clear()
+        db = SessionLocal()
+        try:
+            recording = True
+            query.run(db)
+        finally:
+            recording = False
+            db.rollback()
+            db.close()
+
+        problems = []
+        details = []
+        with engine.connect() as conn:
+            for statement, parameters in captured:
+                if dialect == "sqlite":
+                    accesses = explain_sqlite(conn, statement, parameters, stats)
+                else:
+                    accesses = explain_postgres(conn, statement, parameters)
+                problems += check(query, accesses)
+                details.append((statement, accesses))
+
+        status = "OK  " if not problems else "FALLA"
+        print(f"[{status}] {query.name} ({len(captured)} consultas)")
+        for problem in dict.fromkeys(problems):
+            print(f"         - {problem}")
+        if args.verbose or problems:
+            for statement, accesses in details:
+                print("         " + " ".join(statement.split())[:160])
+                for access in accesses:
+                    print(f"           · {access['detail']}  ~{access.get('rows', 0)} filas")
+        if not captured:
+            problems.append("no se capturó ninguna consulta")
+            print("         - no se capturó ninguna consulta")
+        failures += bool(problems)
+
+    print()
+    if failures:
+        print(f"[ERROR] {failures} consulta(s) caliente(s) con plan degradado.")
+        return 1
+    print("[INFO] Todos los planes usan índices dentro del presupuesto.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
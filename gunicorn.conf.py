@@ -0,0 +1,50 @@
+"""
+Perfil de producción: Gunicorn como supervisor de workers Uvicorn.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+- Número de workers según las CPUs disponibles para el contenedor
+  (sobrescribible con WEB_CONCURRENCY).
+- uvloop/httptools cuando están instalados (loop="auto", http="auto").
+- SIGTERM: cada worker deja de aceptar conexiones, termina las peticiones en
+  curso y los correos pendientes en BackgroundTasks (se ejecutan dentro del
+  ciclo de la petición) antes de salir, con un límite de GRACEFUL_TIMEOUT.
+- Los workers se reciclan tras MAX_REQUESTS peticiones (con jitter para que
+  no se reinicien todos a la vez).
+"""
+import os
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        return os.cpu_count() or 1
+
+
+def _default_workers() -> int:
+    # La app es mayormente I/O (BD y Gmail API); 2 por CPU, con un tope razonable
+    # para no agotar las conexiones de PostgreSQL en Railway.
+    return max(2, min(_available_cpus() * 2, 8))
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", _default_workers()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Reciclado de workers
+max_requests = int(os.getenv("MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "100"))
+
+# Apagado ordenado: tiempo para vaciar peticiones y correos en curso
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+# Railway termina TLS en su proxy
+forwarded_allow_ips = "*"
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
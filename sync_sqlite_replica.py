@@ -0,0 +1,44 @@
+"""
+Réplica de lectura local con dos archivos SQLite, para probar DATABASE_REPLICA_URL.
+Ejecutar desde la raíz del proyecto:
+    python sync_sqlite_replica.py dev.db dev_replica.db [--interval 5]
+
+Copia periódicamente la base principal sobre la réplica (API de backup de
+SQLite), simulando una réplica asíncrona con `interval` segundos de retraso.
+En otra terminal:
+    DATABASE_URL=sqlite:///./dev.db DATABASE_REPLICA_URL=sqlite:///./dev_replica.db \\
+        uvicorn app.main:app --reload
+"""
+import argparse
+import sqlite3
+import time
+
+
+def sync_once(primary: str, replica: str) -> None:
+    src = sqlite3.connect(primary)
+    dst = sqlite3.connect(replica)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincroniza una réplica SQLite local.")
+    parser.add_argument("primary")
+    parser.add_argument("replica")
+    parser.add_argument("--interval", type=float, default=5.0, help="segundos entre copias (retraso simulado)")
+    parser.add_argument("--once", action="store_true", help="copiar una vez y salir")
+    args = parser.parse_args()
+
+    while True:
+        sync_once(args.primary, args.replica)
+        print(f"[INFO] Réplica actualizada: {args.primary} → {args.replica}")
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()